@@ -0,0 +1,279 @@
+# collection/admission.py
+#
+# Admission control so one batch client hammering the full artwork list
+# can't drag interactive traffic down with it. Two independent checks run
+# before a view is called:
+#
+#   1. A token bucket per client. Every request costs tokens (the full list
+#      and the aggregate views cost more), and a client that runs dry gets a
+#      fast 429 with Retry-After instead of a queued request.
+#   2. A concurrency cap for the expensive views. Slots are flock()ed files,
+#      so the cap holds across all gunicorn workers on the box, not just
+#      per process. When every slot is busy the request gets a 503.
+#
+# Both checks are shared by every worker on the machine (the buckets live in
+# one file in LOCK_DIR), so a client's limit doesn't depend on how many
+# workers there are or which one it lands on. Only the counters behind
+# /api/admission/stats/ are per worker process.
+
+import fcntl
+import hashlib
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import JsonResponse
+
+DEFAULTS = {
+    'ENABLED': True,
+    # Tokens added per second and the bucket size, per client
+    'RATE': 20,
+    'BURST': 60,
+    'DEFAULT_COST': 1,
+    # url name -> cost of a GET to that route
+    'COSTS': {},
+    # url name -> how many may run at once across all workers
+    'CONCURRENCY': {},
+    # Routes that really serve ?ids= batches (CachedObjectMixin.batch_retrieve).
+    # Only there does ?ids= make a request cheap.
+    'BATCH_ROUTES': ['artwork-list', 'artist-list'],
+    # How many X-Forwarded-For hops to trust (0 = use REMOTE_ADDR)
+    'PROXY_COUNT': 0,
+    # Records in the shared bucket file (24 bytes each). Clients that hash
+    # to the same record evict each other, so keep it well above the number
+    # of clients active within a BURST / RATE window.
+    'BUCKET_SLOTS': 65536,
+    'LOCK_DIR': Path(tempfile.gettempdir()) / 'museum_api_admission',
+}
+
+
+class TokenBucket:
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, cost, now):
+        """Returns 0 if admitted, otherwise the seconds until `cost` is affordable."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0
+        return (cost - self.tokens) / self.rate
+
+
+class BucketTable:
+    """
+    Every client's token bucket, in one file shared by all processes on the
+    machine. A client hashes to one fixed-size record (owner, tokens, last
+    refill) that is read, refilled and written back under an fcntl record
+    lock on just that record, so different clients never wait on each other.
+    """
+    RECORD = struct.Struct('=Qdd')
+
+    def __init__(self, path, slots):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.slots = slots
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+    def take(self, client, cost, rate, burst, now):
+        """Same contract as TokenBucket.take, for `client`'s shared bucket."""
+        digest = hashlib.blake2b(client.encode(), digest_size=8).digest()
+        owner = int.from_bytes(digest, 'little') or 1  # 0 marks an empty record
+        size = self.RECORD.size
+        offset = (owner % self.slots) * size
+
+        fcntl.lockf(self.fd, fcntl.LOCK_EX, size, offset)
+        try:
+            bucket = TokenBucket(rate, burst, now)
+            raw = os.pread(self.fd, size, offset)
+            if len(raw) == size:
+                stored_owner, tokens, updated = self.RECORD.unpack(raw)
+                # Another client's record means ours was evicted: start full.
+                if stored_owner == owner:
+                    bucket.tokens = tokens
+                    bucket.updated = min(updated, now)
+            wait = bucket.take(cost, now)
+            os.pwrite(self.fd, self.RECORD.pack(owner, bucket.tokens, bucket.updated), offset)
+            return wait
+        finally:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, size, offset)
+
+    def client_count(self):
+        data = os.pread(self.fd, self.slots * self.RECORD.size, 0)
+        usable = len(data) - len(data) % self.RECORD.size
+        return sum(1 for owner, _, _ in self.RECORD.iter_unpack(data[:usable]) if owner)
+
+    def clear(self):
+        """Forgets every client, in every process (tests use this)."""
+        os.ftruncate(self.fd, 0)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class SlotLimiter:
+    """At most `limit` holders at once, shared by every process on the machine."""
+
+    def __init__(self, name, limit, lock_dir):
+        lock_dir = Path(lock_dir)
+        lock_dir.mkdir(parents=True, exist_ok=True)
+        self.paths = [lock_dir / f'{name}.{slot}.lock' for slot in range(limit)]
+
+    def acquire(self):
+        """Returns a held file descriptor, or None if every slot is busy."""
+        for path in self.paths:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                os.close(fd)
+        return None
+
+    def release(self, fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+class AdmissionController:
+    # Wall-clock time, because the bucket timestamps are compared across processes
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.buckets = None
+        self.reset()
+
+    def reset(self):
+        """Re-reads settings and forgets this process's counters."""
+        config = dict(DEFAULTS, **getattr(settings, 'ADMISSION_CONTROL', {}))
+        with self._lock:
+            self.config = config
+            if self.buckets is not None:
+                self.buckets.close()
+            self.buckets = BucketTable(Path(config['LOCK_DIR']) / 'buckets.bin', config['BUCKET_SLOTS'])
+            self._limiters = {
+                name: SlotLimiter(name, limit, config['LOCK_DIR'])
+                for name, limit in config['CONCURRENCY'].items()
+            }
+            self.counters = Counter()
+            self.per_endpoint = {}
+
+    def is_bulk_read(self, request, url_name):
+        # Writes and ?ids= batches (capped at a handful of pk lookups) are cheap
+        # even on the list routes, so only plain reads get the route's cost/cap.
+        # Other views ignore ?ids= and run their full query, so it buys nothing there.
+        if request.method not in ('GET', 'HEAD'):
+            return False
+        return not ('ids' in request.GET and url_name in self.config['BATCH_ROUTES'])
+
+    def cost(self, request, url_name):
+        if not self.is_bulk_read(request, url_name):
+            return self.config['DEFAULT_COST']
+        return self.config['COSTS'].get(url_name, self.config['DEFAULT_COST'])
+
+    def client_id(self, request):
+        proxies = self.config['PROXY_COUNT']
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        if proxies and forwarded:
+            hops = [hop.strip() for hop in forwarded.split(',')]
+            # The right-most hops were added by our own proxies, so they can be trusted.
+            return hops[max(len(hops) - proxies, 0)]
+        return request.META.get('REMOTE_ADDR', 'unknown')
+
+    def take_tokens(self, client, cost):
+        now = self._clock()
+        # fcntl record locks only exclude other processes, so threads in this
+        # one also take the in-process lock.
+        with self._lock:
+            return self.buckets.take(client, cost, self.config['RATE'], self.config['BURST'], now)
+
+    def limiter(self, request, url_name):
+        if not self.is_bulk_read(request, url_name):
+            return None
+        return self._limiters.get(url_name)
+
+    def count(self, outcome, url_name):
+        with self._lock:
+            self.counters[outcome] += 1
+            self.per_endpoint.setdefault(url_name or 'unknown', Counter())[outcome] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'config': {
+                    'rate': self.config['RATE'],
+                    'burst': self.config['BURST'],
+                    'costs': self.config['COSTS'],
+                    'concurrency': self.config['CONCURRENCY'],
+                },
+                'tracked_clients': self.buckets.client_count(),
+                'totals': dict(self.counters),
+                'endpoints': {name: dict(counts) for name, counts in self.per_endpoint.items()},
+            }
+
+
+controller = AdmissionController()
+
+
+@receiver(setting_changed)
+def reset_on_settings_change(setting, **kwargs):
+    # Keeps override_settings(ADMISSION_CONTROL=...) in tests working.
+    if setting == 'ADMISSION_CONTROL':
+        controller.reset()
+
+
+class AdmissionControlMiddleware:
+    """
+    Applies the token bucket and the concurrency caps to every resolved view.
+    Rejections are answered straight away with 429 / 503 and Retry-After.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            slot = getattr(request, '_admission_slot', None)
+            if slot is not None:
+                limiter, fd = slot
+                limiter.release(fd)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not controller.config['ENABLED']:
+            return None
+        url_name = request.resolver_match.url_name
+
+        wait = controller.take_tokens(controller.client_id(request), controller.cost(request, url_name))
+        if wait:
+            controller.count('throttled', url_name)
+            return self._reject(429, "Request rate limit exceeded for this client.", wait)
+
+        limiter = controller.limiter(request, url_name)
+        if limiter is not None:
+            fd = limiter.acquire()
+            if fd is None:
+                controller.count('shed', url_name)
+                return self._reject(503, "This endpoint is at capacity, try again shortly.", 1)
+            request._admission_slot = (limiter, fd)
+
+        controller.count('admitted', url_name)
+        return None
+
+    def _reject(self, status, detail, retry_after):
+        response = JsonResponse({'detail': detail}, status=status)
+        response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
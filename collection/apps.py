@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CollectionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'collection'
+
+    def ready(self):
+        # Hooks the change-log and artwork-count receivers up to the models.
+        from . import changes, signals  # noqa: F401
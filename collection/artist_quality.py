@@ -0,0 +1,148 @@
+# collection/artist_quality.py
+#
+# The MET 'Artist Display Name' column isn't always a person. Some rows are
+# just a nationality or place ('Chinese', 'Italian, Siena'), some are several
+# people glued together with '|', and some are hedged attributions
+# ('Follower of Guercino', 'Workshop of Botticelli'). Instead of filtering
+# those out with a hardcoded list at query time, the loader classifies each
+# name once and stores the result as flags on Artist, together with a
+# precomputed artwork_count, so ProlificArtistView is a plain indexed read.
+#
+# The rules can be overridden with settings.ARTIST_CLASSIFIER.
+
+import re
+from collections import defaultdict
+
+from django.conf import settings
+
+DEFAULT_RULES = {
+    # A name made up only of these words is a label, not a person. Words in
+    # (...) or [...] don't count: 'British artist (London)' is a label,
+    # 'Raphael (Raffaello Sanzio or Santi)' is not.
+    'LABEL_WORDS': [
+        'unknown', 'unidentified', 'anonymous', 'artist', 'painter', 'school',
+        'manufactory', 'porcelain', 'royal',
+        'american', 'austrian', 'austro', 'british', 'chinese', 'dutch', 'english',
+        'european', 'flemish', 'french', 'german', 'hungarian', 'italian', 'japanese',
+        'lombard', 'netherlandish', 'roman', 'sienese', 'spanish', 'thai', 'venetian',
+        'veronese',
+        'austria', 'berlin', 'brabant', 'brussels', 'emilia', 'england', 'ferrara',
+        'flanders', 'france', 'friuli', 'germany', 'gubbio', 'italy', 'lombardy',
+        'london', 'milan', 'naples', 'netherlands', 'rhine', 'rome', 'siena',
+        'sèvres', 'transylvania', 'tuscany', 'tyrol', 'veneto',
+        'central', 'northern', 'southern', 'upper', 'middle',
+        'active', 'century', 'th', 'st', 'nd', 'rd', 'early', 'late', 'mid', 'ca',
+        'about', 'first', 'second', 'third', 'fourth', 'half', 'quarter',
+        'uncertain', 'date', 'the', 'of', 'or',
+    ],
+    # Case-insensitive regexes for names that hedge the attribution.
+    'QUALIFIER_PATTERNS': [
+        r'\b(follower|workshop|circle|style|manner|imitator|school|pupil|studio) of\b',
+        r'^(copy )?after\b',
+        r'^attributed to\b',
+        r'\bworkshop$',
+    ],
+    # Joins several people in one display name.
+    'SEPARATOR': '|',
+    # 'Artist Role' entries whose names are not linked as attributions.
+    'SKIPPED_ROLES': ['Former Attribution'],
+}
+
+FLAG_FIELDS = ('is_nationality_label', 'is_multi_attribution', 'is_qualified_attribution', 'is_individual')
+
+WORD = re.compile(r'[^\W\d_]+')
+ASIDE = re.compile(r'\([^)]*\)|\[[^\]]*\]')
+
+
+def rules():
+    return dict(DEFAULT_RULES, **getattr(settings, 'ARTIST_CLASSIFIER', {}))
+
+
+def split_names(name, config=None):
+    """'A|B|A' -> ['A', 'B'] (stripped, de-duplicated, order kept)."""
+    config = config or rules()
+    parts = [part.strip() for part in name.split(config['SEPARATOR'])]
+    return list(dict.fromkeys(part for part in parts if part))
+
+
+def classify_name(name, config=None):
+    """Returns the quality flags for one Artist name."""
+    config = config or rules()
+    label_words = {word.lower() for word in config['LABEL_WORDS']}
+    parts = split_names(name, config)
+
+    words = [word.lower() for word in WORD.findall(ASIDE.sub(' ', name))]
+    is_label = bool(words) and all(word in label_words for word in words)
+    is_multi = len(parts) > 1
+    is_qualified = any(
+        re.search(pattern, part, re.IGNORECASE)
+        for pattern in config['QUALIFIER_PATTERNS']
+        for part in parts
+    )
+    return {
+        'is_nationality_label': is_label,
+        'is_multi_attribution': is_multi,
+        'is_qualified_attribution': is_qualified,
+        'is_individual': not (is_label or is_multi or is_qualified),
+    }
+
+
+def attributed_names(display_name, roles='', config=None):
+    """
+    The individual names an artwork is attributed to. Names whose matching
+    'Artist Role' is a skipped role (e.g. a former attribution) are left out.
+    """
+    config = config or rules()
+    names = [part.strip() for part in display_name.split(config['SEPARATOR'])]
+    role_list = [role.strip() for role in roles.split(config['SEPARATOR'])] if roles else []
+    if len(role_list) != len(names):
+        # Roles don't line up with the names, so keep everyone.
+        role_list = [''] * len(names)
+    kept = [name for name, role in zip(names, role_list) if name and role not in config['SKIPPED_ROLES']]
+    return list(dict.fromkeys(kept))
+
+
+def refresh_artwork_counts(artist_model, artwork_model, artist_ids=None):
+    """
+    Recomputes Artist.artwork_count: distinct artworks that name the artist
+    either as the main artist or as one of the split attributions.
+    Takes the model classes so migrations can pass their historical ones.
+    """
+    through = artwork_model.attributions.through
+    direct = artwork_model.objects.exclude(artist_id=None)
+    attributed = through.objects.all()
+    artists = artist_model.objects.all()
+    if artist_ids is not None:
+        artist_ids = set(artist_ids)
+        direct = direct.filter(artist_id__in=artist_ids)
+        attributed = attributed.filter(artist_id__in=artist_ids)
+        artists = artists.filter(pk__in=artist_ids)
+
+    works = defaultdict(set)
+    for artist_id, artwork_id in direct.values_list('artist_id', 'object_id'):
+        works[artist_id].add(artwork_id)
+    for artist_id, artwork_id in attributed.values_list('artist_id', 'artwork_id'):
+        works[artist_id].add(artwork_id)
+
+    changed = []
+    for artist in artists.only('pk', 'artwork_count'):
+        count = len(works.get(artist.pk, ()))
+        if artist.artwork_count != count:
+            artist.artwork_count = count
+            changed.append(artist)
+    artist_model.objects.bulk_update(changed, ['artwork_count'], batch_size=500)
+    return len(changed)
+
+
+def reclassify_artists(artist_model, config=None):
+    """Re-applies the rules to every artist (after changing ARTIST_CLASSIFIER)."""
+    config = config or rules()
+    changed = []
+    for artist in artist_model.objects.all():
+        flags = classify_name(artist.name, config)
+        if any(getattr(artist, field) != value for field, value in flags.items()):
+            for field, value in flags.items():
+                setattr(artist, field, value)
+            changed.append(artist)
+    artist_model.objects.bulk_update(changed, list(FLAG_FIELDS), batch_size=500)
+    return len(changed)
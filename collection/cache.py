@@ -0,0 +1,183 @@
+# collection/cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Max
+
+
+# Sentinel so a cached None never gets confused with a miss.
+MISSING = object()
+
+
+class ObjectCache:
+    """
+    A small in-process read-through cache for serialized objects.
+    Entries are kept in LRU order, capped at `max_size` and expire
+    after `ttl` seconds. Every gunicorn worker gets its own copy; see
+    ChangeLogSync below for how writes made elsewhere reach it.
+    """
+
+    def __init__(self, name, max_size=1024, ttl=300, clock=time.monotonic):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            return self._get(key)
+
+    def get_many(self, keys):
+        """Returns ({key: value} for the hits, [keys that missed])."""
+        found, missing = {}, []
+        with self._lock:
+            for key in keys:
+                value = self._get(key)
+                if value is MISSING:
+                    missing.append(key)
+                else:
+                    found[key] = value
+        return found, missing
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def reset(self):
+        """Drops every entry and zeroes the counters (handy in tests)."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    def _get(self, key):
+        # Caller must hold the lock.
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+
+class ChangeLogSync:
+    """
+    Keeps this process's caches in step with writes made anywhere: other
+    gunicorn workers, the job runner, the admin or manage.py. Every write
+    to a cached model leaves a row in the Change log (collection/changes.py),
+    so before serving from the cache we look up the newest Change.seq (one
+    primary key read) and drop the entries changed since the last look.
+    If too much changed (a loader run), or the log went backwards (a
+    restored database), everything is dropped instead.
+    """
+
+    def __init__(self, caches, max_replay=1000):
+        self.caches = caches  # Change.model_name -> ObjectCache
+        self.max_replay = max_replay
+        self.seen = None
+        self._lock = threading.Lock()
+        self.full_clears = 0
+
+    def sync(self):
+        from .models import Change
+
+        with self._lock:
+            # MAX() of the rowid is a single b-tree seek in SQLite
+            newest = Change.objects.aggregate(newest=Max('seq'))['newest'] or 0
+            if newest == self.seen:
+                return
+            if self.seen is None or newest < self.seen or newest - self.seen > self.max_replay:
+                for cache in self.caches.values():
+                    cache.clear()
+                self.full_clears += 1
+            else:
+                changed = Change.objects.filter(seq__gt=self.seen, seq__lte=newest)
+                for model_name, object_id in changed.values_list('model_name', 'object_id'):
+                    cache = self.caches.get(model_name)
+                    if cache is not None:
+                        cache.invalidate(object_id)
+            self.seen = newest
+
+    def invalidate(self, model_name, object_ids):
+        """Drops entries right away (the change-log receivers call this)."""
+        cache = self.caches.get(model_name)
+        if cache is not None:
+            for object_id in object_ids:
+                cache.invalidate(object_id)
+
+    def reset(self):
+        with self._lock:
+            self.seen = None
+            self.full_clears = 0
+
+    def stats(self):
+        with self._lock:
+            return {'change_seq': self.seen, 'full_clears': self.full_clears}
+
+
+def _build_cache(name):
+    config = getattr(settings, 'OBJECT_CACHE', {})
+    return ObjectCache(
+        name,
+        max_size=config.get('MAX_SIZE', 1024),
+        ttl=config.get('TTL', 300),
+    )
+
+
+# One cache per model that the viewsets serve by primary key.
+artwork_cache = _build_cache('artworks')
+artist_cache = _build_cache('artists')
+
+ALL_CACHES = (artwork_cache, artist_cache)
+
+change_sync = ChangeLogSync(
+    {'artwork': artwork_cache, 'artist': artist_cache},
+    max_replay=getattr(settings, 'OBJECT_CACHE', {}).get('MAX_REPLAY', 1000),
+)
+
+
+def cache_stats():
+    stats = {cache.name: cache.stats() for cache in ALL_CACHES}
+    stats['change_log'] = change_sync.stats()
+    return stats
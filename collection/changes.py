@@ -0,0 +1,106 @@
+# collection/changes.py
+#
+# Keeps the Change log (see models.Change) in step with the catalog tables.
+# The signal receivers cover anything that goes through the ORM one object
+# at a time; bulk paths (like the data loader) suspend them and call
+# record_bulk() instead, because bulk_create never sends post_save.
+
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .cache import change_sync
+from .models import Artist, Artwork, Change, MediumCategory
+
+TRACKED_MODELS = (Artist, Artwork, MediumCategory)
+
+_state = threading.local()
+
+
+@contextmanager
+def suspend_tracking():
+    """Turns the receivers off for the current thread (for bulk loads)."""
+    previous = getattr(_state, 'suspended', False)
+    _state.suspended = True
+    try:
+        yield
+    finally:
+        _state.suspended = previous
+
+
+def is_suspended():
+    return getattr(_state, 'suspended', False)
+
+
+def record(model, object_ids, action=Change.UPSERT):
+    """
+    Appends one Change row per id, in a single INSERT, and drops those
+    objects from this process's object caches. Other processes notice the
+    new rows through cache.change_sync.
+    """
+    model_name = model._meta.model_name
+    object_ids = list(object_ids)
+    Change.objects.bulk_create([
+        Change(model_name=model_name, object_id=object_id, action=action)
+        for object_id in object_ids
+    ])
+    change_sync.invalidate(model_name, object_ids)
+
+
+def record_bulk(model, object_ids, action=Change.UPSERT, batch_size=500):
+    """Same as record() but chunked, for loader-sized id lists."""
+    object_ids = list(object_ids)
+    for start in range(0, len(object_ids), batch_size):
+        record(model, object_ids[start:start + batch_size], action)
+
+
+def _artwork_ids(queryset):
+    return list(queryset.values_list('pk', flat=True))
+
+
+@receiver(post_save)
+def track_save(sender, instance, created, raw=False, **kwargs):
+    if sender not in TRACKED_MODELS or raw or is_suspended():
+        return
+    record(sender, [instance.pk])
+
+    # Artwork payloads embed the artist name and medium names,
+    # so renaming either one changes those artworks as well.
+    if not created and sender in (Artist, MediumCategory):
+        record(Artwork, _artwork_ids(instance.artworks.all()))
+
+
+@receiver(pre_delete)
+def track_dependents_before_delete(sender, instance, **kwargs):
+    # Deleting an artist nulls artwork.artist and deleting a medium drops
+    # through rows; neither sends a save/m2m signal for the artworks, so
+    # grab them now while the links still exist.
+    if sender not in (Artist, MediumCategory) or is_suspended():
+        return
+    record(Artwork, _artwork_ids(instance.artworks.all()))
+
+
+@receiver(post_delete)
+def track_delete(sender, instance, **kwargs):
+    if sender not in TRACKED_MODELS or is_suspended():
+        return
+    record(sender, [instance.pk], Change.DELETE)
+
+
+@receiver(m2m_changed, sender=Artwork.mediums.through)
+def track_medium_links(sender, instance, action, reverse, pk_set, **kwargs):
+    if is_suspended():
+        return
+
+    if not reverse:
+        # artwork.mediums.add/remove/clear -> only this artwork changed
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            record(Artwork, [instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        # medium.artworks.add/remove -> pk_set holds the artworks
+        record(Artwork, sorted(pk_set))
+    elif action == 'pre_clear':
+        # medium.artworks.clear() doesn't tell us who was linked afterwards
+        record(Artwork, _artwork_ids(instance.artworks.all()))
@@ -0,0 +1,275 @@
+# collection/jobs.py
+#
+# A small local job system. The API only inserts a queued Job row; the
+# `manage.py run_jobs` process claims rows and runs them on a thread pool.
+# Keeping the pool in its own (niced) process means heavy jobs never eat
+# into the gunicorn request workers. Per-kind limits stop, say, two loader
+# runs from overlapping.
+#
+# The runner reads and writes the same SQLite file and RESULT_DIR as the web
+# workers, so it has to run on the same machine. gunicorn.conf.py starts it
+# next to the web workers; a flock()ed LOCK_FILE keeps it to one runner per box.
+#
+# settings.JOBS['RUNNER'] = 'eager' runs jobs inline instead (used in tests).
+
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'RUNNER': 'worker',
+    'MAX_WORKERS': 2,
+    'KIND_LIMITS': {},
+    'POLL_INTERVAL': 2,
+    'NICE': 10,
+    # Jobs of one kind that may wait in the queue; more are refused with a 409
+    'MAX_QUEUED': 3,
+    # Succeeded jobs per kind whose artifact is kept on disk
+    'KEEP_RESULTS': 5,
+    'RESULT_DIR': Path(settings.BASE_DIR) / 'job_results',
+    'LOCK_FILE': Path(tempfile.gettempdir()) / 'museum_api_jobs.lock',
+}
+
+EXPORT_CHUNK_SIZE = 500
+
+
+def job_settings():
+    return dict(DEFAULTS, **getattr(settings, 'JOBS', {}))
+
+
+def result_path(job):
+    return Path(job_settings()['RESULT_DIR']) / job.result_file
+
+
+def queue_is_full(kind):
+    return Job.objects.filter(kind=kind, status=Job.QUEUED).count() >= job_settings()['MAX_QUEUED']
+
+
+def acquire_runner_lock(path=None):
+    """Returns a held file descriptor, or None if another runner already has it."""
+    fd = os.open(path or job_settings()['LOCK_FILE'], os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return fd
+    except BlockingIOError:
+        os.close(fd)
+        return None
+
+
+def report_progress(job, percent, message=''):
+    job.progress = percent
+    job.message = message
+    Job.objects.filter(pk=job.pk).update(progress=percent, message=message)
+
+
+# --- Job handlers ---
+# Each one gets the Job, does the work and returns the artifact file name.
+
+def run_export(job):
+    """Every artwork as the API serializes it, in one JSON file."""
+    from .views import ArtworkViewSet
+    from .serializers import ArtworkSerializer
+
+    queryset = ArtworkViewSet.queryset.all()
+    total = queryset.count()
+    file_name = f'job-{job.pk}-artworks.json'
+    path = Path(job_settings()['RESULT_DIR']) / file_name
+
+    done = 0
+    last_pk = None
+    with open(path, 'w', encoding='utf-8') as out:
+        out.write('[')
+        while True:
+            # Keyset pagination on the PK, so each chunk is an index range read.
+            chunk = queryset if last_pk is None else queryset.filter(object_id__gt=last_pk)
+            chunk = list(chunk[:EXPORT_CHUNK_SIZE])
+            if not chunk:
+                break
+            for artwork in chunk:
+                out.write(',' if done else '')
+                out.write(json.dumps(ArtworkSerializer(artwork).data))
+                done += 1
+            last_pk = chunk[-1].object_id
+            report_progress(job, int(done * 100 / total) if total else 100, f"{done}/{total} artworks")
+        out.write(']')
+    return file_name
+
+
+def run_aggregates(job):
+    """Recomputes the stored aggregates and a snapshot of the aggregate endpoints."""
+    from .artist_quality import reclassify_artists, refresh_artwork_counts
+    from .models import Artist, Artwork
+    from .views import MediumSummaryView, ProlificArtistView
+    from .serializers import MediumSummarySerializer, ProlificArtistSerializer
+
+    # Picks up any change to settings.ARTIST_CLASSIFIER, then recounts.
+    report_progress(job, 5, "Re-classifying artists")
+    reclassify_artists(Artist)
+    report_progress(job, 10, "Counting artworks per artist")
+    refresh_artwork_counts(Artist, Artwork)
+    prolific = ProlificArtistSerializer(ProlificArtistView().get_queryset(), many=True).data
+    report_progress(job, 50, "Counting artworks per medium")
+    mediums = MediumSummarySerializer(MediumSummaryView().get_queryset(), many=True).data
+
+    file_name = f'job-{job.pk}-aggregates.json'
+    with open(Path(job_settings()['RESULT_DIR']) / file_name, 'w', encoding='utf-8') as out:
+        json.dump({
+            'generated_at': timezone.now().isoformat(),
+            'prolific_artists': prolific,
+            'medium_summary': mediums,
+        }, out)
+    return file_name
+
+
+def run_load_data(job):
+    """Re-runs collection/scripts/data_loader.py and records the row counts."""
+    from .models import Artist, Artwork, MediumCategory
+    from .scripts import data_loader
+
+    # The loader runs in one transaction, and SQLite has a single writer, so
+    # progress written to the Job row from inside it would only show up at
+    # the commit. Say what's happening up front and log the stages instead.
+    report_progress(job, 5, "Reloading the catalog in one transaction; the old one is served until it commits")
+    data_loader.run(progress=lambda percent, message: logger.info("Job %s: %s%% %s", job.pk, percent, message))
+
+    file_name = f'job-{job.pk}-load.json'
+    with open(Path(job_settings()['RESULT_DIR']) / file_name, 'w', encoding='utf-8') as out:
+        json.dump({
+            'artworks': Artwork.objects.count(),
+            'artists': Artist.objects.count(),
+            'mediums': MediumCategory.objects.count(),
+        }, out)
+    return file_name
+
+
+HANDLERS = {
+    Job.EXPORT: run_export,
+    Job.AGGREGATES: run_aggregates,
+    Job.LOAD_DATA: run_load_data,
+}
+
+
+# --- Running ---
+
+def claim(job_id):
+    """Atomically flips a queued job to running. False if someone else got it."""
+    return Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+        status=Job.RUNNING, started_at=timezone.now()
+    ) == 1
+
+
+def execute(job_id):
+    """Runs an already-claimed job and records how it ended."""
+    job = Job.objects.get(pk=job_id)
+    Path(job_settings()['RESULT_DIR']).mkdir(parents=True, exist_ok=True)
+    try:
+        job.result_file = HANDLERS[job.kind](job)
+        job.status = Job.SUCCEEDED
+        job.progress = 100
+    except Exception:
+        logger.exception("Job %s failed", job_id)
+        job.status = Job.FAILED
+        job.error = traceback.format_exc()
+    job.finished_at = timezone.now()
+    job.save(update_fields=['result_file', 'status', 'progress', 'message', 'error', 'finished_at'])
+    if job.status == Job.SUCCEEDED:
+        prune_results(job.kind)
+
+
+def prune_results(kind):
+    """Deletes the artifacts of all but the newest KEEP_RESULTS succeeded jobs of a kind."""
+    old = list(
+        Job.objects.filter(kind=kind, status=Job.SUCCEEDED).exclude(result_file='')
+        .order_by('-id')[job_settings()['KEEP_RESULTS']:]
+    )
+    for job in old:
+        result_path(job).unlink(missing_ok=True)
+    Job.objects.filter(pk__in=[job.pk for job in old]).update(
+        result_file='', message="Result removed to make room for newer ones."
+    )
+
+
+def submit(job):
+    """Called after a Job row is created through the API."""
+    if job_settings()['RUNNER'] == 'eager':
+        if claim(job.pk):
+            execute(job.pk)
+        job.refresh_from_db()
+    # Otherwise the run_jobs process will pick it up on its next poll.
+
+
+class JobRunner:
+    """
+    Claims queued jobs and runs them on a thread pool, honouring the
+    overall MAX_WORKERS and the per-kind KIND_LIMITS.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or job_settings()
+        self.max_workers = self.config['MAX_WORKERS']
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+        self.running = Counter()
+        self._lock = threading.Lock()
+
+    def recover(self):
+        """Marks jobs left 'running' by a runner that died as failed."""
+        return Job.objects.filter(status=Job.RUNNING).update(
+            status=Job.FAILED, error="Interrupted: the job runner stopped while this job was running.",
+            finished_at=timezone.now(),
+        )
+
+    def dispatch(self):
+        """Starts as many queued jobs as the limits allow. Returns how many started."""
+        started = 0
+        with self._lock:
+            while sum(self.running.values()) < self.max_workers:
+                # Kinds at their limit are left out of the query, so a long
+                # backlog of one kind can't hide jobs of another.
+                saturated = [
+                    kind for kind, count in self.running.items()
+                    if count >= self.config['KIND_LIMITS'].get(kind, self.max_workers)
+                ]
+                queued = (
+                    Job.objects.filter(status=Job.QUEUED).exclude(kind__in=saturated)
+                    .order_by('id').values_list('id', 'kind').first()
+                )
+                if queued is None:
+                    break
+                job_id, kind = queued
+                if not claim(job_id):
+                    continue  # another runner got it; look again
+                self.running[kind] += 1
+                started += 1
+                self.executor.submit(self._run, job_id, kind)
+        return started
+
+    def busy(self):
+        with self._lock:
+            return sum(self.running.values()) > 0
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+    def _run(self, job_id, kind):
+        try:
+            execute(job_id)
+        finally:
+            # Pool threads have their own DB connection; don't leak it.
+            connection.close()
+            with self._lock:
+                self.running[kind] -= 1
@@ -0,0 +1,104 @@
+# collection/management/commands/measure_startup.py
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs inside a brand new interpreter, like a freshly forked worker would.
+# Prints one JSON line with its own timings on stdout.
+CHILD_SCRIPT = """
+import json, sys, time
+from wsgiref.util import setup_testing_defaults
+
+path, warm = sys.argv[1], sys.argv[2] == '1'
+started = time.perf_counter()
+from museum_api_project.wsgi import application
+imported = time.perf_counter()
+
+if warm:
+    from collection.warmup import warm_up
+    warm_up()
+warmed = time.perf_counter()
+
+environ = {'PATH_INFO': path, 'REQUEST_METHOD': 'GET', 'HTTP_ACCEPT': 'application/json'}
+setup_testing_defaults(environ)
+body = iter(application(environ, lambda status, headers, exc_info=None: None))
+next(body, b'')
+first_byte = time.perf_counter()
+
+print(json.dumps({
+    'import': imported - started,
+    'warmup': warmed - imported,
+    'ttfb': first_byte - warmed,
+}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Starts fresh Python processes the way a gunicorn worker does and reports "
+        "how long the app takes to import and to return the first byte of a request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="Number of cold starts to time.")
+        parser.add_argument('--path', default='/api/artworks/recent/', help="URL to request after boot.")
+        parser.add_argument('--no-warmup', action='store_true', help="Skip collection.warmup before the request.")
+        parser.add_argument('--top-imports', type=int, default=10, help="How many of the slowest imports to list.")
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        # Measure what a web worker loads, not the management-only apps.
+        env.pop('MUSEUM_MANAGEMENT_APPS', None)
+        warm = '0' if options['no_warmup'] else '1'
+
+        samples = []
+        import_report = ''
+        for _ in range(options['runs']):
+            started = time.perf_counter()
+            proc = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT, options['path'], warm],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            wall = time.perf_counter() - started
+            if proc.returncode != 0:
+                self.stderr.write(proc.stderr)
+                raise SystemExit(proc.returncode)
+            sample = json.loads(proc.stdout.strip().splitlines()[-1])
+            sample['process'] = wall
+            samples.append(sample)
+            import_report = proc.stderr
+
+        self.stdout.write(f"Cold starts: {len(samples)}  path: {options['path']}  warm-up: {warm == '1'}")
+        for key, label in (
+            ('import', 'App import'),
+            ('warmup', 'Warm-up'),
+            ('ttfb', 'Time to first byte'),
+            ('process', 'Whole process'),
+        ):
+            values = [sample[key] * 1000 for sample in samples]
+            self.stdout.write(
+                f"  {label:<20} median {statistics.median(values):8.1f} ms   "
+                f"min {min(values):8.1f} ms   max {max(values):8.1f} ms"
+            )
+
+        if options['top_imports']:
+            self.stdout.write("Slowest imports (cumulative, last run):")
+            for cumulative, module in self._slowest_imports(import_report, options['top_imports']):
+                self.stdout.write(f"  {cumulative / 1000:8.1f} ms  {module}")
+
+    def _slowest_imports(self, report, count):
+        # -X importtime lines look like: "import time:   self |  cumulative | package"
+        rows = []
+        for line in report.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, module = line[len('import time:'):].split('|')
+            rows.append((int(cumulative), module.strip()))
+        return sorted(rows, reverse=True)[:count]
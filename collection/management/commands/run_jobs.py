@@ -0,0 +1,107 @@
+# collection/management/commands/run_jobs.py
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from collection.jobs import JobRunner, acquire_runner_lock, job_settings
+from collection.models import Job
+
+# Seconds to wait before restarting a runner that exited (--respawn)
+RESPAWN_DELAY = 5
+# Exit status when another runner already holds the lock
+ALREADY_RUNNING = 3
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs queued background jobs (exports, aggregate rebuilds, loader runs) "
+        "on a small thread pool, outside the web workers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Run every queued job, wait for them to finish and exit.",
+        )
+        parser.add_argument(
+            '--respawn', action='store_true',
+            help="Supervise a runner in a child process and restart it if it crashes.",
+        )
+
+    def handle(self, *args, **options):
+        # SIGTERM (what a dyno or on_exit sends) and SIGINT both stop the loop
+        # and let the running jobs finish.
+        stopping = threading.Event()
+        previous = {
+            signum: signal.signal(signum, lambda *args: stopping.set())
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        try:
+            if options['respawn']:
+                self.supervise(stopping)
+            else:
+                self.run(stopping, once=options['once'])
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+    def supervise(self, stopping):
+        command = [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'run_jobs']
+        while not stopping.is_set():
+            child = subprocess.Popen(command)
+            while child.poll() is None and not stopping.wait(1):
+                pass
+            if stopping.is_set():
+                child.send_signal(signal.SIGTERM)
+                child.wait()
+                break
+            if child.returncode == ALREADY_RUNNING:
+                self.stdout.write("Another job runner is already running here, not supervising.")
+                break
+            # Crashed, killed, or stopped on its own: nothing else would
+            # ever run the queue, so start a new one.
+            self.stderr.write(
+                f"Job runner exited with {child.returncode}, restarting in {RESPAWN_DELAY}s."
+            )
+            stopping.wait(RESPAWN_DELAY)
+
+    def run(self, stopping, once=False):
+        config = job_settings()
+        # One runner per machine: gunicorn starts one, and a second one started
+        # by hand (or by a gunicorn restart) just steps aside.
+        if acquire_runner_lock(config['LOCK_FILE']) is None:
+            self.stderr.write("Another job runner is already running here, exiting.")
+            sys.exit(ALREADY_RUNNING)
+        if config['NICE']:
+            # Let the gunicorn workers win any fight over the CPU.
+            os.nice(config['NICE'])
+
+        runner = JobRunner(config)
+        interrupted = runner.recover()
+        if interrupted:
+            self.stdout.write(f"Marked {interrupted} interrupted job(s) as failed.")
+        self.stdout.write(
+            f"Job runner started: {runner.max_workers} worker thread(s), "
+            f"polling every {config['POLL_INTERVAL']}s."
+        )
+
+        try:
+            while not stopping.is_set():
+                close_old_connections()
+                started = runner.dispatch()
+                if started:
+                    self.stdout.write(f"Started {started} job(s).")
+                if once and not runner.busy() and not Job.objects.filter(status=Job.QUEUED).exists():
+                    break
+                stopping.wait(config['POLL_INTERVAL'])
+            if stopping.is_set():
+                self.stdout.write("Stopping, waiting for running jobs to finish...")
+        finally:
+            runner.shutdown()
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.27 on 2026-10-19 00:04
+
+from django.db import migrations, models
+
+
+def seed_change_log(apps, schema_editor):
+    # One upsert per row that already exists, so a new mirror that asks for
+    # since=0 gets a complete snapshot before any live changes.
+    Change = apps.get_model('collection', 'Change')
+    for model_name in ('artist', 'mediumcategory', 'artwork'):
+        model = apps.get_model('collection', model_name)
+        Change.objects.bulk_create(
+            [
+                Change(model_name=model_name, object_id=pk, action='upsert')
+                for pk in model.objects.order_by('pk').values_list('pk', flat=True)
+            ],
+            batch_size=500,
+        )
+
+
+def clear_change_log(apps, schema_editor):
+    apps.get_model('collection', 'Change').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model_name', models.CharField(max_length=50)),
+                ('object_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('upsert', 'Upsert'), ('delete', 'Delete')], max_length=6)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['seq'],
+            },
+        ),
+        migrations.RunPython(seed_change_log, clear_change_log),
+    ]
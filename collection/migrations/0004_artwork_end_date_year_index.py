@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-19 00:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0003_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='artwork',
+            name='end_date_year',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,180 @@
+# Generated by Django 4.2.27 on 2026-10-19 00:12
+
+import csv
+import re
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.db import migrations, models
+
+# A frozen copy of collection/artist_quality.py's rules and helpers as they
+# were when this migration was written. Later changes to that module, or to
+# settings.ARTIST_CLASSIFIER, must not change what this backfill did;
+# re-classify with an 'aggregates' job instead.
+LABEL_WORDS = {
+    'unknown', 'unidentified', 'anonymous', 'artist', 'painter', 'school',
+    'manufactory', 'porcelain', 'royal',
+    'american', 'austrian', 'austro', 'british', 'chinese', 'dutch', 'english',
+    'european', 'flemish', 'french', 'german', 'hungarian', 'italian', 'japanese',
+    'lombard', 'netherlandish', 'roman', 'sienese', 'spanish', 'thai', 'venetian',
+    'veronese',
+    'austria', 'berlin', 'brabant', 'brussels', 'emilia', 'england', 'ferrara',
+    'flanders', 'france', 'friuli', 'germany', 'gubbio', 'italy', 'lombardy',
+    'london', 'milan', 'naples', 'netherlands', 'rhine', 'rome', 'siena',
+    'sèvres', 'transylvania', 'tuscany', 'tyrol', 'veneto',
+    'central', 'northern', 'southern', 'upper', 'middle',
+    'active', 'century', 'th', 'st', 'nd', 'rd', 'early', 'late', 'mid', 'ca',
+    'about', 'first', 'second', 'third', 'fourth', 'half', 'quarter',
+    'uncertain', 'date', 'the', 'of', 'or',
+}
+QUALIFIER_PATTERNS = [
+    r'\b(follower|workshop|circle|style|manner|imitator|school|pupil|studio) of\b',
+    r'^(copy )?after\b',
+    r'^attributed to\b',
+    r'\bworkshop$',
+]
+SEPARATOR = '|'
+SKIPPED_ROLES = {'Former Attribution'}
+WORD = re.compile(r'[^\W\d_]+')
+ASIDE = re.compile(r'\([^)]*\)|\[[^\]]*\]')
+
+
+def split_names(name):
+    parts = [part.strip() for part in name.split(SEPARATOR)]
+    return list(dict.fromkeys(part for part in parts if part))
+
+
+def classify_name(name):
+    parts = split_names(name)
+    words = [word.lower() for word in WORD.findall(ASIDE.sub(' ', name))]
+    is_label = bool(words) and all(word in LABEL_WORDS for word in words)
+    is_multi = len(parts) > 1
+    is_qualified = any(
+        re.search(pattern, part, re.IGNORECASE) for pattern in QUALIFIER_PATTERNS for part in parts
+    )
+    return {
+        'is_nationality_label': is_label,
+        'is_multi_attribution': is_multi,
+        'is_qualified_attribution': is_qualified,
+        'is_individual': not (is_label or is_multi or is_qualified),
+    }
+
+
+def attributed_names(display_name, roles=''):
+    names = [part.strip() for part in display_name.split(SEPARATOR)]
+    role_list = [role.strip() for role in roles.split(SEPARATOR)] if roles else []
+    if len(role_list) != len(names):
+        role_list = [''] * len(names)
+    kept = [name for name, role in zip(names, role_list) if name and role not in SKIPPED_ROLES]
+    return list(dict.fromkeys(kept))
+
+
+def artist_roles():
+    """{object_id: 'Artist Role'} from the CSV the loader reads, if it's there."""
+    path = Path(settings.BASE_DIR) / 'data' / 'artwork_final.csv'
+    if not path.exists():
+        return {}
+    roles = {}
+    with open(path, encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            try:
+                roles[int(row.get('Object ID'))] = row.get('Artist Role', '')
+            except (TypeError, ValueError):
+                continue
+    return roles
+
+
+def refresh_artwork_counts(Artist, Artwork):
+    works = defaultdict(set)
+    for artist_id, artwork_id in Artwork.objects.exclude(artist_id=None).values_list('artist_id', 'object_id'):
+        works[artist_id].add(artwork_id)
+    for artist_id, artwork_id in Artwork.attributions.through.objects.values_list('artist_id', 'artwork_id'):
+        works[artist_id].add(artwork_id)
+    artists = list(Artist.objects.only('pk', 'artwork_count'))
+    for artist in artists:
+        artist.artwork_count = len(works.get(artist.pk, ()))
+    Artist.objects.bulk_update(artists, ['artwork_count'], batch_size=500)
+
+
+def backfill_artist_quality(apps, schema_editor):
+    # Flags, split attributions and counts for data loaded before this
+    # migration. Former attributions are skipped using the 'Artist Role'
+    # column of data/artwork_final.csv, like the loader does; artworks the
+    # CSV doesn't know get every name in their pipe-joined artist linked.
+    Artist = apps.get_model('collection', 'Artist')
+    Artwork = apps.get_model('collection', 'Artwork')
+
+    Change = apps.get_model('collection', 'Change')
+    created_ids = []
+    for artist in list(Artist.objects.all()):
+        for part in split_names(artist.name):
+            if part != artist.name:
+                component, created = Artist.objects.get_or_create(name=part, defaults=classify_name(part))
+                if created:
+                    created_ids.append(component.pk)
+    # Historical models don't fire the change-log receivers, so mirrors
+    # following /api/changes/ would never hear about the new artists otherwise.
+    Change.objects.bulk_create(
+        [Change(model_name='artist', object_id=pk, action='upsert') for pk in created_ids],
+        batch_size=500,
+    )
+    for artist in Artist.objects.all():
+        for field, value in classify_name(artist.name).items():
+            setattr(artist, field, value)
+        artist.save()
+
+    roles = artist_roles()
+    artist_ids = dict(Artist.objects.values_list('name', 'id'))
+    links = []
+    for object_id, name in Artwork.objects.exclude(artist=None).values_list('object_id', 'artist__name'):
+        for part in attributed_names(name, roles.get(object_id, '')):
+            links.append(Artwork.attributions.through(artwork_id=object_id, artist_id=artist_ids[part]))
+    Artwork.attributions.through.objects.bulk_create(links, ignore_conflicts=True)
+
+    refresh_artwork_counts(Artist, Artwork)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0004_artwork_end_date_year_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artist',
+            name='artwork_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='artist',
+            name='is_individual',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='artist',
+            name='is_multi_attribution',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='artist',
+            name='is_nationality_label',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='artist',
+            name='is_qualified_attribution',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='artwork',
+            name='attributions',
+            field=models.ManyToManyField(blank=True, related_name='attributed_artworks', to='collection.artist'),
+        ),
+        migrations.AddIndex(
+            model_name='artist',
+            index=models.Index(condition=models.Q(('is_individual', True)), fields=['-artwork_count'], name='artist_prolific_idx'),
+        ),
+        migrations.RunPython(backfill_artist_quality, migrations.RunPython.noop),
+    ]
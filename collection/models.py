@@ -2,6 +2,8 @@
 
 from django.db import models
 
+from .artist_quality import FLAG_FIELDS, classify_name
+
 # 1. The Artist Model (Parent)
 # I kept this simple but made 'name' unique so my seeding script 
 # won't create the same person twice if they appear in multiple rows.
@@ -13,6 +15,40 @@ class Artist(models.Model):
     # It helps group artists by their background or style.
     period_style = models.CharField(max_length=100, blank=True, null=True)
 
+    # Data quality flags, worked out from the name (see artist_quality.py).
+    # Lots of 'artists' in the CSV are really 'Chinese', 'A|B' or 'Follower of X'.
+    is_nationality_label = models.BooleanField(default=False)
+    is_multi_attribution = models.BooleanField(default=False)
+    is_qualified_attribution = models.BooleanField(default=False)
+    # None of the above, i.e. an actual single person
+    is_individual = models.BooleanField(default=True)
+
+    # Precomputed number of artworks credited to this artist
+    # (kept up to date by the loader and collection/signals.py)
+    artwork_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Powers the 'prolific artists' query: filter + sort straight off the index.
+            # Partial, because SQLite won't match a bare boolean column against a
+            # leading index column, but it does match the index's WHERE clause.
+            models.Index(
+                fields=['-artwork_count'],
+                condition=models.Q(is_individual=True),
+                name='artist_prolific_idx',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Classify on every save so API-created or renamed artists get the
+        # same flags as the ones the loader created.
+        for field, value in classify_name(self.name).items():
+            setattr(self, field, value)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | set(FLAG_FIELDS)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.name
 
@@ -39,7 +75,8 @@ class Artwork(models.Model):
     department = models.CharField(max_length=150)
     
     # Keeping this as an Integer so I can easily do range filters (e.g., artworks after 1990)
-    end_date_year = models.IntegerField(null=True, blank=True) 
+    # Indexed because the 'recent' query filters and sorts on it.
+    end_date_year = models.IntegerField(null=True, blank=True, db_index=True)
 
     # One-to-Many: Each artwork has one main artist.
     # Set to NULL on delete so we don't lose the artwork if an artist record is removed.
@@ -54,5 +91,78 @@ class Artwork(models.Model):
     # This many-to-many link is what allows my 'Medium Summary' query to work.
     mediums = models.ManyToManyField(MediumCategory, related_name='artworks')
 
+    # The individual people behind a pipe-joined 'Artist Display Name'
+    # ('A|B' -> A and B), minus former attributions. Used for the counts.
+    attributions = models.ManyToManyField(Artist, related_name='attributed_artworks', blank=True)
+
+    def __str__(self):
+        return self.title
+
+# 4. The Change Log (Delta Sync)
+# Every create/update/delete on the three catalog tables appends a row here.
+# 'seq' is an AUTOINCREMENT primary key, so it only ever goes up and mirrors
+# can ask for "everything after seq N" straight off the PK index.
+class Change(models.Model):
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    ACTION_CHOICES = [
+        (UPSERT, 'Upsert'),
+        (DELETE, 'Delete'),
+    ]
+
+    seq = models.BigAutoField(primary_key=True)
+    # Lower-case model name, e.g. 'artwork', 'artist' or 'mediumcategory'
+    model_name = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=6, choices=ACTION_CHOICES)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['seq']
+
+    def __str__(self):
+        return f"#{self.seq} {self.action} {self.model_name}:{self.object_id}"
+
+
+# 5. Background Jobs
+# Exports, aggregate rebuilds and loader runs are too slow for a request,
+# so the API just queues a row here and `manage.py run_jobs` picks it up.
+class Job(models.Model):
+    EXPORT = 'export'
+    AGGREGATES = 'aggregates'
+    LOAD_DATA = 'load_data'
+    KIND_CHOICES = [
+        (EXPORT, 'Export all artworks'),
+        (AGGREGATES, 'Rebuild aggregates'),
+        (LOAD_DATA, 'Re-run the data loader'),
+    ]
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    # Percent done, updated by the job as it goes
+    progress = models.PositiveSmallIntegerField(default=0)
+    message = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    # File name of the artifact inside settings.JOBS['RESULT_DIR']
+    result_file = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        # The runner polls for the oldest queued jobs
+        indexes = [models.Index(fields=['status', 'id'], name='job_status_idx')]
+
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return f"Job #{self.pk} ({self.kind}, {self.status})"
@@ -0,0 +1,83 @@
+# collection/query_plan.py
+#
+# Test helper that catches queries which stopped using an index.
+# It records the SQL an endpoint runs, asks SQLite for the plan of each
+# SELECT (EXPLAIN QUERY PLAN) and flags the two things that get slow as
+# the collection grows:
+#
+#   - full scans:    "SCAN collection_artwork" (with or without an index)
+#   - temp B-trees:  "USE TEMP B-TREE FOR ORDER BY / GROUP BY / DISTINCT"
+#
+# Endpoints that really do need one of those (the unpaginated lists, the
+# medium aggregate) list it explicitly in an allowlist, so anything new
+# shows up as a test failure.
+#
+# Caveats:
+#   - SQLite before 3.36 prints "SCAN TABLE x" / "SEARCH TABLE x". explain()
+#     drops the "TABLE " so allowlists are written in the newer form and hold
+#     for both.
+#   - The plans come from the tiny, never ANALYZEd test database, so the
+#     planner is going on its default estimates. A full-size db.sqlite3 with
+#     sqlite_stat1 can pick a different plan. The guard catches an index that
+#     can't be used, not every plan a real table might get.
+
+import re
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+FULL_SCAN = re.compile(r'^SCAN (?!CONSTANT ROW)')
+TEMP_BTREE = re.compile(r'USE TEMP B-TREE')
+OLD_TABLE_PREFIX = re.compile(r'^(SCAN|SEARCH) TABLE ')
+
+
+def normalize(detail):
+    """'SCAN TABLE x' (SQLite < 3.36) -> 'SCAN x'"""
+    return OLD_TABLE_PREFIX.sub(r'\1 ', detail)
+
+
+def explain(sql, using='default'):
+    """Returns the detail lines of SQLite's plan for `sql`."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        # Rows are (id, parent, notused, detail)
+        return [normalize(row[-1]) for row in cursor.fetchall()]
+
+
+def plan_problems(details, allow=()):
+    """The plan lines that are scans / temp B-trees and not allowlisted."""
+    allowed = [re.compile(pattern) for pattern in allow]
+    return [
+        detail for detail in details
+        if (FULL_SCAN.search(detail) or TEMP_BTREE.search(detail))
+        and not any(pattern.search(detail) for pattern in allowed)
+    ]
+
+
+def capture_plans(request, using='default'):
+    """
+    Calls `request()` (e.g. lambda: client.get(url)) and returns
+    [(sql, plan details)] for every SELECT it ran.
+    """
+    with CaptureQueriesContext(connections[using]) as captured:
+        request()
+    return [
+        (query['sql'], explain(query['sql'], using))
+        for query in captured.captured_queries
+        if query['sql'].lstrip().upper().startswith('SELECT')
+    ]
+
+
+class QueryPlanAssertionsMixin:
+    """TestCase mixin: self.assertIndexedPlans(lambda: self.client.get(url), allow=[...])"""
+
+    def assertIndexedPlans(self, request, allow=(), using='default'):
+        plans = capture_plans(request, using)
+        failures = []
+        for sql, details in plans:
+            problems = plan_problems(details, allow)
+            if problems:
+                failures.append(f"{sql}\n    -> " + "\n    -> ".join(problems))
+        if failures:
+            self.fail("Queries without a usable index:\n" + "\n".join(failures))
+        return plans
@@ -1,36 +1,63 @@
 import csv
 import os
-from collection.models import Artist, Artwork, MediumCategory
+from collection.models import Artist, Artwork, MediumCategory, Change
+from collection.changes import record_bulk, suspend_tracking
+from collection.artist_quality import attributed_names, classify_name, refresh_artwork_counts, split_names
+from django.conf import settings
 from django.db import transaction # Used for efficient bulk operations
 
-# --- FILE PATHS (Relative to the project root, where you will run the script) ---
+# --- FILE PATHS (Relative to the project root) ---
 # NOTE: The file names MUST match the output of your filtering script.
-ARTIST_CSV_PATH = 'data/artist_final.csv'
-ARTWORK_CSV_PATH = 'data/artwork_final.csv'
-MEDIUM_CSV_PATH = 'data/medium_final.csv' 
+# Anchored on BASE_DIR so background jobs can run the loader from any cwd.
+ARTIST_CSV_PATH = os.path.join(settings.BASE_DIR, 'data/artist_final.csv')
+ARTWORK_CSV_PATH = os.path.join(settings.BASE_DIR, 'data/artwork_final.csv')
+MEDIUM_CSV_PATH = os.path.join(settings.BASE_DIR, 'data/medium_final.csv')
 
 
-def run():
+def run(progress=None):
     """
-    The main function called by `python manage.py runscript data_loader`
+    The main function called by `python manage.py runscript data_loader`.
+    `progress(percent, message)` is optional; the job runner passes one in.
     """
+    report = progress or (lambda percent, message: None)
     print("--- Starting Data Load for Lehman Collection ---")
 
-    # Clear old data first to ensure a clean run
-    MediumCategory.objects.all().delete()
-    Artwork.objects.all().delete()
-    Artist.objects.all().delete()
-    
-    # --- 1. Load the Independent Tables First ---
-    load_mediums()
-    load_artists()
-
-    # --- 2. Load the Core Table (Artwork) and Create Relationships ---
-    load_artworks_and_relationships()
+    # The per-object change receivers would add one INSERT per row here,
+    # so they're switched off and the change log is written in bulk instead.
+    # Everything is one transaction: the API keeps serving the old catalog
+    # (and /api/changes/ shows nothing) until the new one is complete.
+    with suspend_tracking(), transaction.atomic():
+        # Clear old data first to ensure a clean run
+        report(0, "Clearing existing data")
+        clear_existing_data()
+
+        # --- 1. Load the Independent Tables First ---
+        report(20, "Loading mediums")
+        load_mediums()
+        report(35, "Loading artists")
+        load_artists()
+
+        # --- 2. Load the Core Table (Artwork) and Create Relationships ---
+        report(50, "Loading artworks and relationships")
+        load_artworks_and_relationships()
+
+        # --- 3. Precompute the per-artist artwork counts ---
+        report(90, "Counting artworks per artist")
+        refresh_artwork_counts(Artist, Artwork)
 
     print("\n--- Data Load Complete: Database is Populated ---")
 
 
+def clear_existing_data():
+    """Deletes the catalog and writes tombstones for everything removed"""
+    # One transaction, so the deletes and their tombstones land together
+    with transaction.atomic():
+        for model in (MediumCategory, Artwork, Artist):
+            removed_ids = list(model.objects.values_list('pk', flat=True))
+            model.objects.all().delete()
+            record_bulk(model, removed_ids, Change.DELETE)
+
+
 def load_mediums():
     """Loads the MediumCategory table (M2M target)"""
     print("1. Loading Medium Categories...")
@@ -46,6 +73,8 @@ def load_mediums():
         
         # Bulk creation is efficient for large datasets (R4)
         MediumCategory.objects.bulk_create(mediums_to_create, ignore_conflicts=True)
+        # ignore_conflicts means SQLite doesn't hand the pks back, so re-read them
+        record_bulk(MediumCategory, MediumCategory.objects.values_list('pk', flat=True))
         print(f"   -> Created {MediumCategory.objects.count()} Mediums.")
 
 
@@ -64,9 +93,14 @@ def load_artists():
             # you would assign it here, e.g., period_style = row.get('Artist Nationality')
             
             if name:
-                artists_to_create.append(Artist(name=name)) 
+                # 'A|B' stays as its own row (artworks point at it), but A and B
+                # get rows too so the split attributions have something to link to.
+                for artist_name in dict.fromkeys([name] + split_names(name)):
+                    # bulk_create skips Artist.save(), so classify here
+                    artists_to_create.append(Artist(name=artist_name, **classify_name(artist_name)))
         
         Artist.objects.bulk_create(artists_to_create, ignore_conflicts=True)
+        record_bulk(Artist, Artist.objects.values_list('pk', flat=True))
         print(f"   -> Created {Artist.objects.count()} Artists.")
 
 
@@ -80,6 +114,7 @@ def load_artworks_and_relationships():
 
     artworks_to_create = []
     artwork_mediums_map = {} # Maps Artwork ID to a list of MediumCategory objects
+    artwork_attributions_map = {} # Maps Artwork ID to the individual Artist objects
 
     with open(ARTWORK_CSV_PATH, mode='r', encoding='utf-8') as file:
         reader = csv.DictReader(file)
@@ -118,14 +153,18 @@ def load_artworks_and_relationships():
                     if medium_objects:
                         artwork_mediums_map[object_id] = medium_objects
 
+                # --- 3d. Split 'A|B' into individual attributions, skipping former ones ---
+                names = attributed_names(artist_name_key, row.get('Artist Role', ''))
+                artwork_attributions_map[object_id] = [artist_lookup[n] for n in names if n in artist_lookup]
+
             except Exception as e:
                 print(f"Error processing artwork ID {row.get('Object ID')}: {e}")
         
-    # --- 3d. Bulk Create Artworks ---
+    # --- 3e. Bulk Create Artworks ---
     Artwork.objects.bulk_create(artworks_to_create)
     print(f"   -> Created {Artwork.objects.count()} Artworks.")
 
-    # --- 3e. Set Many-to-Many Relationships ---
+    # --- 3f. Set Many-to-Many Relationships ---
     # NOTE: M2M cannot be set during bulk_create, must be done separately.
     print("4. Establishing Many-to-Many links for Mediums...")
     
@@ -139,5 +178,17 @@ def load_artworks_and_relationships():
             if artwork_obj:
                 # Use set() to establish the relationship
                 artwork_obj.mediums.set(medium_list)
+
+    # Attributions go straight into the through table in one go
+    Attribution = Artwork.attributions.through
+    Attribution.objects.bulk_create([
+        Attribution(artwork_id=artwork_id, artist_id=artist.pk)
+        for artwork_id, artists in artwork_attributions_map.items()
+        if artwork_id in all_artworks
+        for artist in artists
+    ], ignore_conflicts=True)
+
+    # Logged after the M2M links so the upserts describe the finished rows
+    record_bulk(Artwork, all_artworks.keys())
     
-    print(f"   -> Successfully linked Mediums to Artworks.")
\ No newline at end of file
+    print(f"   -> Successfully linked Mediums and attributions to Artworks.")
\ No newline at end of file
@@ -1,7 +1,8 @@
 # collection/serializers.py
 
 from rest_framework import serializers
-from .models import Artist, Artwork, MediumCategory
+from rest_framework.reverse import reverse
+from .models import Artist, Artwork, Job, MediumCategory
 
 # --- 1. Basic Serializers ---
 class MediumCategorySerializer(serializers.ModelSerializer):
@@ -38,4 +39,25 @@ class ProlificArtistSerializer(serializers.Serializer):
 # Query #2: Medium Summary
 class MediumSummarySerializer(serializers.Serializer):
     name = serializers.CharField()
-    artwork_count = serializers.IntegerField()
\ No newline at end of file
+    artwork_count = serializers.IntegerField()
+
+# --- 4. Background Jobs ---
+class JobSerializer(serializers.ModelSerializer):
+    # Only filled in once the job has an artifact to download
+    result_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = (
+            'id', 'kind', 'status', 'progress', 'message', 'error',
+            'created_at', 'started_at', 'finished_at', 'result_url',
+        )
+        read_only_fields = (
+            'status', 'progress', 'message', 'error',
+            'created_at', 'started_at', 'finished_at',
+        )
+
+    def get_result_url(self, job):
+        if job.status != Job.SUCCEEDED or not job.result_file:
+            return None
+        return reverse('job-result', args=[job.pk], request=self.context.get('request'))
@@ -0,0 +1,69 @@
+# collection/signals.py
+#
+# Keeps the precomputed Artist.artwork_count right for writes that go
+# through the API/ORM one artwork at a time. The data loader suspends these
+# (see changes.suspend_tracking) and recounts everything once at the end.
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .artist_quality import refresh_artwork_counts
+from .changes import is_suspended
+from .models import Artist, Artwork
+
+
+def _recount(artist_ids):
+    artist_ids = {artist_id for artist_id in artist_ids if artist_id is not None}
+    if artist_ids:
+        refresh_artwork_counts(Artist, Artwork, artist_ids)
+
+
+@receiver(pre_save, sender=Artwork)
+def remember_previous_artist(sender, instance, raw=False, **kwargs):
+    # If the artwork moves to another artist, both counts change.
+    instance._previous_artist_id = None
+    if raw or is_suspended() or instance._state.adding:
+        return
+    instance._previous_artist_id = (
+        Artwork.objects.filter(pk=instance.pk).values_list('artist_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Artwork)
+def recount_after_save(sender, instance, raw=False, **kwargs):
+    if raw or is_suspended():
+        return
+    _recount([instance.artist_id, getattr(instance, '_previous_artist_id', None)])
+
+
+@receiver(pre_delete, sender=Artwork)
+def remember_credited_artists(sender, instance, **kwargs):
+    # The attribution rows are gone by post_delete, so collect them now.
+    if is_suspended():
+        return
+    instance._credited_artist_ids = [instance.artist_id] + list(
+        instance.attributions.values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Artwork)
+def recount_after_delete(sender, instance, **kwargs):
+    if is_suspended():
+        return
+    _recount(getattr(instance, '_credited_artist_ids', [instance.artist_id]))
+
+
+@receiver(m2m_changed, sender=Artwork.attributions.through)
+def recount_after_attribution_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if is_suspended():
+        return
+    if reverse:
+        # artist.attributed_artworks.add/remove/clear -> only this artist's count moves
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _recount([instance.pk])
+    elif action == 'pre_clear':
+        instance._cleared_artist_ids = list(instance.attributions.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        _recount(getattr(instance, '_cleared_artist_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        _recount(pk_set)
@@ -1,13 +1,56 @@
 # tests.py
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+import unittest
+from unittest import mock
+from pathlib import Path
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIClient
 from rest_framework import status
-from collection.models import Artist, Artwork # Fixed relative import for Django test runner
+from collection.models import Artist, Artwork, Change, Job, MediumCategory # Fixed relative import for Django test runner
+from collection.cache import ALL_CACHES, MISSING, ObjectCache, artist_cache, artwork_cache, change_sync
+from collection.warmup import ALL_STEPS, warm_up
+from collection import admission, jobs
+from collection.query_plan import QueryPlanAssertionsMixin, normalize, plan_problems
+from collection.artist_quality import attributed_names, classify_name, split_names
+
+
+def setUpModule():
+    # Keep the bucket file and slot locks away from the real ones in /tmp,
+    # which a server running on the same machine would be using.
+    lock_dir = tempfile.mkdtemp(prefix='museum-admission-')
+    patcher = mock.patch.dict(admission.DEFAULTS, LOCK_DIR=lock_dir)
+    patcher.start()
+    unittest.addModuleCleanup(shutil.rmtree, lock_dir, ignore_errors=True)
+    unittest.addModuleCleanup(patcher.stop)
+    admission.controller.reset()
+
+
+def reset_runtime_state():
+    # Object caches and rate-limit buckets outlive a single test,
+    # so every test starts from empty ones.
+    for cache in ALL_CACHES:
+        cache.reset()
+    change_sync.reset()
+    admission.controller.reset()
+    admission.controller.buckets.clear()
+
 
 class ArtApiTests(TestCase):
     def setUp(self):
         # Setting up some dummy data to verify JSON structure.
         # Just making sure the API doesn't break when rendering for the frontend.
+        reset_runtime_state()
         self.client = APIClient()
         self.artist = Artist.objects.create(name="Test Artist", period_style="Modern")
         self.artwork = Artwork.objects.create(
@@ -40,4 +83,607 @@ class ArtApiTests(TestCase):
             "end_date_year": 2024
         }
         response = self.client.post('/api/artworks/', data)
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+class BatchAndCacheTests(TestCase):
+    def setUp(self):
+        reset_runtime_state()
+        self.client = APIClient()
+        self.artist = Artist.objects.create(name="Batch Artist", period_style="Modern")
+        for object_id in (1, 2, 3):
+            Artwork.objects.create(
+                object_id=object_id,
+                title=f"Piece {object_id}",
+                department="Lehman",
+                end_date_year=2000 + object_id,
+                artist=self.artist
+            )
+
+    def test_batch_is_keyed_by_the_requested_ids(self):
+        # Unknown ids (404 here) come back as null instead of failing the whole batch.
+        response = self.client.get('/api/artworks/?ids=3,1,404')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data), [3, 1, 404])
+        self.assertEqual(response.data[3]['object_id'], 3)
+        self.assertIsNone(response.data[404])
+        self.assertEqual(list(response.json()), ['3', '1', '404'])
+
+    def test_batch_rejects_bad_ids(self):
+        response = self.client.get('/api/artworks/?ids=1,abc')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_out_of_range_ids_are_a_bad_request(self):
+        response = self.client.get('/api/artworks/?ids=99999999999999999999')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/artworks/99999999999999999999/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cache_does_not_keep_the_request_alive(self):
+        self.client.get('/api/artworks/1/')
+        self.assertIs(type(artwork_cache.get(1)), dict)
+
+    def test_batch_uses_a_single_lookup_query(self):
+        # Change log check + artwork rows + the mediums prefetch, no matter how many ids.
+        with self.assertNumQueries(3):
+            self.client.get('/api/artworks/?ids=1,2,3')
+        # Second time round only the change log check hits the database.
+        with self.assertNumQueries(1):
+            self.client.get('/api/artworks/?ids=1,2,3')
+        self.assertEqual(artwork_cache.stats()['hits'], 3)
+
+    def test_retrieve_is_cached_and_invalidated_on_update(self):
+        self.client.get('/api/artworks/1/')
+        with self.assertNumQueries(1):
+            self.client.get('/api/artworks/1/')
+
+        self.client.patch('/api/artworks/1/', {"title": "Renamed"}, format='json')
+        response = self.client.get('/api/artworks/1/')
+        self.assertEqual(response.data['title'], "Renamed")
+
+    def test_artist_rename_clears_artwork_payloads(self):
+        self.client.get('/api/artworks/1/')
+        self.client.patch(f'/api/artists/{self.artist.pk}/', {"name": "New Name"}, format='json')
+        response = self.client.get('/api/artworks/1/')
+        self.assertEqual(response.data['artist_name'], "New Name")
+
+    def test_writes_from_other_processes_invalidate(self):
+        self.client.get('/api/artworks/1/')
+        # What another worker's write looks like from here: a new row in
+        # the change log, and no receiver ran in this process.
+        Artwork.objects.filter(pk=1).update(title="Changed elsewhere")
+        Change.objects.create(model_name='artwork', object_id=1, action=Change.UPSERT)
+        self.assertEqual(self.client.get('/api/artworks/1/').data['title'], "Changed elsewhere")
+
+    def test_orm_writes_outside_the_api_invalidate(self):
+        self.client.get(f'/api/artists/{self.artist.pk}/')
+        self.client.get('/api/artworks/1/')
+        # Admin, shell or job: a plain save() goes through the change-log receivers.
+        self.artist.name = "Saved Elsewhere"
+        self.artist.save()
+        self.assertEqual(self.client.get(f'/api/artists/{self.artist.pk}/').data['name'], "Saved Elsewhere")
+        self.assertEqual(self.client.get('/api/artworks/1/').data['artist_name'], "Saved Elsewhere")
+
+        pk = self.artist.pk
+        self.artist.delete()
+        self.assertEqual(self.client.get(f'/api/artists/{pk}/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_large_change_bursts_clear_everything(self):
+        self.client.get('/api/artworks/1/')
+        self.client.get(f'/api/artists/{self.artist.pk}/')
+        Change.objects.bulk_create([
+            Change(model_name='mediumcategory', object_id=n, action=Change.UPSERT)
+            for n in range(change_sync.max_replay + 1)
+        ])
+        self.client.get('/api/artworks/2/')
+        self.assertEqual(artist_cache.stats()['size'], 0)
+        self.assertEqual(change_sync.stats()['full_clears'], 2)  # first look + the burst
+
+    def test_lru_eviction_is_counted(self):
+        cache = ObjectCache('test', max_size=2, ttl=60)
+        for key in (1, 2, 3):
+            cache.set(key, key)
+        self.assertIs(cache.get(1), MISSING)
+        self.assertEqual(cache.get(3), 3)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_cache_stats_endpoint(self):
+        response = self.client.get('/api/cache/stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('hit_ratio', response.data['artworks'])
+
+
+
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        reset_runtime_state()
+        self.client = APIClient()
+        self.artist = Artist.objects.create(name="Feed Artist")
+        self.artwork = Artwork.objects.create(
+            object_id=7777, title="Feed Piece", department="Lehman", artist=self.artist
+        )
+
+    def feed(self, since=0, **params):
+        return self.client.get('/api/changes/', {'since': since, **params}).data
+
+    def test_creates_show_up_as_upserts(self):
+        results = self.feed()['results']
+        self.assertEqual(
+            [(r['model'], r['object_id'], r['action']) for r in results],
+            [('artist', self.artist.pk, 'upsert'), ('artwork', 7777, 'upsert')]
+        )
+        self.assertEqual(results[1]['data']['title'], "Feed Piece")
+
+    def test_since_only_returns_newer_changes(self):
+        cursor = self.feed()['next_since']
+        self.assertEqual(self.feed(cursor)['results'], [])
+
+        self.artwork.delete()
+        results = self.feed(cursor)['results']
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['action'], 'delete')
+        self.assertIsNone(results[0]['data'])
+
+    def test_medium_links_and_artist_delete_touch_the_artwork(self):
+        cursor = self.feed()['next_since']
+        medium = MediumCategory.objects.create(name="Ink")
+        self.artwork.mediums.add(medium)
+        self.artist.delete()  # SET_NULL on the artwork
+
+        results = self.feed(cursor)['results']
+        artwork_change = [r for r in results if r['model'] == 'artwork'][0]
+        self.assertEqual(artwork_change['data']['mediums'], [{'name': 'Ink'}])
+        self.assertIn(('artist', 'delete'), [(r['model'], r['action']) for r in results])
+
+    def test_pagination(self):
+        page = self.feed(limit=1)
+        self.assertEqual(len(page['results']), 1)
+        self.assertTrue(page['has_more'])
+        page = self.feed(page['next_since'], limit=1)
+        self.assertEqual(page['results'][0]['object_id'], 7777)
+        self.assertFalse(page['has_more'])
+
+    def test_write_and_its_change_row_commit_together(self):
+        locked = OperationalError("database is locked")
+        with mock.patch.object(Change.objects, 'bulk_create', side_effect=locked):
+            with self.assertRaises(OperationalError):
+                self.client.patch('/api/artworks/7777/', {"title": "Never Logged"}, format='json')
+        # The failed log write took the update down with it.
+        self.assertEqual(Artwork.objects.get(pk=7777).title, "Feed Piece")
+
+    def test_seq_is_never_reused(self):
+        # AUTOINCREMENT: even after the newest row is gone the next seq goes up,
+        # so a mirror's cursor can never point at a recycled number.
+        newest = Change.objects.order_by('-seq').first()
+        deleted_seq = newest.seq
+        newest.delete()
+        MediumCategory.objects.create(name="After Delete")
+        self.assertGreater(Change.objects.order_by('-seq').first().seq, deleted_seq)
+
+    def test_out_of_range_since_is_a_bad_request(self):
+        response = self.client.get('/api/changes/', {'since': '99999999999999999999'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+
+class WarmUpTests(TestCase):
+    def setUp(self):
+        reset_runtime_state()
+        artist = Artist.objects.create(name="Warm Artist")
+        Artwork.objects.create(object_id=5555, title="Warm Piece", department="Lehman", artist=artist)
+
+    def test_runs_every_step_and_primes_the_cache(self):
+        timings = warm_up()
+        self.assertEqual(tuple(timings), ALL_STEPS)
+        self.assertEqual(artwork_cache.stats()['size'], 1)
+
+        # A retrieve right after boot only checks the change log.
+        with self.assertNumQueries(1):
+            APIClient().get('/api/artworks/5555/')
+
+    def test_database_step_reads_every_hot_table_and_index(self):
+        with CaptureQueriesContext(connection) as captured:
+            warm_up(steps=('database',))
+        sql = "\n".join(query['sql'] for query in captured.captured_queries)
+        for table in ('collection_artwork', 'collection_artist', 'collection_mediumcategory',
+                      'collection_artwork_mediums', 'collection_artwork_attributions'):
+            with self.subTest(table=table):
+                self.assertIn(f'FROM "{table}" NOT INDEXED', sql)
+                with connection.cursor() as cursor:
+                    cursor.execute(f'PRAGMA index_list("{table}")')
+                    indexes = [row[1] for row in cursor.fetchall() if not row[4]]
+                self.assertTrue(indexes)
+                for index in indexes:
+                    self.assertIn(f'INDEXED BY "{index}"', sql)
+
+
+
+class AdmissionControlTests(TestCase):
+    def setUp(self):
+        reset_runtime_state()
+        self.client = APIClient()
+
+    @override_settings(ADMISSION_CONTROL={'RATE': 1, 'BURST': 10, 'COSTS': {'artwork-list': 6}})
+    def test_expensive_route_runs_the_bucket_dry(self):
+        self.assertEqual(self.client.get('/api/artworks/').status_code, status.HTTP_200_OK)
+        response = self.client.get('/api/artworks/')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # 4 tokens left, 6 needed, 1 token per second
+        self.assertEqual(response['Retry-After'], '2')
+        # Cheap routes still fit in what's left
+        self.assertEqual(self.client.get('/api/artworks/?ids=1').status_code, status.HTTP_200_OK)
+
+    @override_settings(ADMISSION_CONTROL={'RATE': 1, 'BURST': 1})
+    def test_clients_get_separate_buckets(self):
+        self.client.get('/api/mediums/', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(self.client.get('/api/mediums/', REMOTE_ADDR='10.0.0.1').status_code, 429)
+        self.assertEqual(self.client.get('/api/mediums/', REMOTE_ADDR='10.0.0.2').status_code, 200)
+
+    @override_settings(ADMISSION_CONTROL={'RATE': 1, 'BURST': 2})
+    def test_buckets_are_shared_between_workers(self):
+        # A second controller stands in for another gunicorn worker.
+        other_worker = admission.AdmissionController()
+        self.addCleanup(other_worker.buckets.close)
+        self.assertEqual(admission.controller.take_tokens('10.0.0.9', 2), 0)
+        self.assertGreater(other_worker.take_tokens('10.0.0.9', 2), 0)
+        self.assertEqual(other_worker.take_tokens('10.0.0.10', 2), 0)
+        self.assertEqual(admission.controller.stats()['tracked_clients'], 2)
+
+    def test_tests_do_not_share_the_servers_lock_dir(self):
+        self.assertNotEqual(Path(admission.controller.config['LOCK_DIR']),
+                            Path(tempfile.gettempdir()) / 'museum_api_admission')
+
+    @override_settings(ADMISSION_CONTROL={'CONCURRENCY': {'prolific-artists': 1}})
+    def test_full_endpoint_sheds_with_503(self):
+        # Pretend another worker is busy with the only slot.
+        limiter = admission.controller._limiters['prolific-artists']
+        fd = limiter.acquire()
+        try:
+            response = self.client.get('/api/artists/prolific/')
+        finally:
+            limiter.release(fd)
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
+        # The slot is free again afterwards
+        self.assertEqual(self.client.get('/api/artists/prolific/').status_code, 200)
+
+    @override_settings(ADMISSION_CONTROL={'RATE': 1, 'BURST': 1})
+    def test_counters_are_exposed(self):
+        self.client.get('/api/mediums/')
+        self.client.get('/api/mediums/')
+        stats = admission.controller.stats()
+        self.assertEqual(stats['endpoints']['mediumcategory-list'], {'admitted': 1, 'throttled': 1})
+
+    def test_stats_endpoint(self):
+        response = self.client.get('/api/admission/stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('totals', response.data)
+
+    @override_settings(ADMISSION_CONTROL={
+        'RATE': 1, 'BURST': 10, 'COSTS': {'medium-summary': 6}, 'CONCURRENCY': {'medium-summary': 1},
+    })
+    def test_ids_does_not_waive_limits_on_non_batch_routes(self):
+        # The summary ignores ?ids= and still runs the full aggregate.
+        self.assertEqual(self.client.get('/api/mediums/summary/?ids=1').status_code, 200)
+        self.assertEqual(self.client.get('/api/mediums/summary/?ids=1').status_code, 429)
+
+        admission.controller.buckets.clear()
+        limiter = admission.controller._limiters['medium-summary']
+        fd = limiter.acquire()
+        try:
+            response = self.client.get('/api/mediums/summary/?ids=1')
+        finally:
+            limiter.release(fd)
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+
+class JobTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        result_dir = tempfile.mkdtemp(prefix='museum-job-results-')
+        cls.addClassCleanup(shutil.rmtree, result_dir, ignore_errors=True)
+        cls.enterClassContext(override_settings(JOBS={'RUNNER': 'eager', 'RESULT_DIR': result_dir}))
+
+    def setUp(self):
+        reset_runtime_state()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("staff", is_staff=True))
+        artist = Artist.objects.create(name="Job Artist", period_style="Modern")
+        for object_id in (11, 12):
+            Artwork.objects.create(object_id=object_id, title=f"Job Piece {object_id}",
+                                   department="Lehman", artist=artist)
+
+    def test_export_job_produces_a_downloadable_file(self):
+        response = self.client.post('/api/jobs/', {"kind": "export"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], Job.SUCCEEDED)
+
+        job = self.client.get(f"/api/jobs/{response.data['id']}/").data
+        self.assertEqual(job['progress'], 100)
+        download = self.client.get(job['result_url'])
+        exported = json.loads(b''.join(download.streaming_content))
+        self.assertEqual([row['object_id'] for row in exported], [11, 12])
+
+    def test_aggregates_job(self):
+        response = self.client.post('/api/jobs/', {"kind": "aggregates"}, format='json')
+        download = self.client.get(response.data['result_url'])
+        snapshot = json.loads(b''.join(download.streaming_content))
+        self.assertEqual(snapshot['prolific_artists'][0]['artist_name'], "Job Artist")
+
+    def test_unknown_kind_is_rejected(self):
+        response = self.client.post('/api/jobs/', {"kind": "rm -rf"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_result_before_finishing_is_a_conflict(self):
+        job = Job.objects.create(kind=Job.EXPORT)
+        response = self.client.get(f'/api/jobs/{job.pk}/result/')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_runner_respects_kind_limits(self):
+        # Two exports queued but only one may run at a time.
+        first = Job.objects.create(kind=Job.EXPORT)
+        second = Job.objects.create(kind=Job.EXPORT)
+        runner = jobs.JobRunner(dict(jobs.job_settings(), MAX_WORKERS=2, KIND_LIMITS={'export': 1}))
+        runner.running['export'] = 1  # pretend one is already going
+        self.assertEqual(runner.dispatch(), 0)
+        runner.shutdown()
+        self.assertEqual(Job.objects.get(pk=first.pk).status, Job.QUEUED)
+        self.assertEqual(Job.objects.get(pk=second.pk).status, Job.QUEUED)
+
+    def test_recover_fails_orphaned_jobs(self):
+        job = Job.objects.create(kind=Job.EXPORT, status=Job.RUNNING)
+        jobs.JobRunner().recover()
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.FAILED)
+
+    def test_only_staff_can_queue_jobs(self):
+        anonymous = APIClient()
+        response = anonymous.post('/api/jobs/', {"kind": "load_data"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Job.objects.exists())
+        # Following a job doesn't need an account
+        job = Job.objects.create(kind=Job.EXPORT)
+        self.assertEqual(anonymous.get(f'/api/jobs/{job.pk}/').status_code, status.HTTP_200_OK)
+
+    def test_full_queue_is_a_conflict(self):
+        for _ in range(jobs.job_settings()['MAX_QUEUED']):
+            Job.objects.create(kind=Job.EXPORT)
+        response = self.client.post('/api/jobs/', {"kind": "export"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Job.objects.count(), jobs.job_settings()['MAX_QUEUED'])
+
+    def test_saturated_kinds_dont_block_other_kinds(self):
+        # A long export backlog ahead of one aggregates job.
+        for _ in range(20):
+            Job.objects.create(kind=Job.EXPORT)
+        aggregates = Job.objects.create(kind=Job.AGGREGATES)
+        runner = jobs.JobRunner(dict(jobs.job_settings(), MAX_WORKERS=2, KIND_LIMITS={'export': 1}))
+        runner.running['export'] = 1
+        runner.executor.submit = lambda *args: None  # claim only, don't run
+        self.assertEqual(runner.dispatch(), 1)
+        runner.shutdown()
+        self.assertEqual(Job.objects.get(pk=aggregates.pk).status, Job.RUNNING)
+
+    def test_old_results_are_pruned(self):
+        with self.settings(JOBS=dict(jobs.job_settings(), KEEP_RESULTS=1)):
+            first = self.client.post('/api/jobs/', {"kind": "export"}, format='json').data
+            second = self.client.post('/api/jobs/', {"kind": "export"}, format='json').data
+        self.assertEqual(self.client.get(f"/api/jobs/{first['id']}/result/").status_code,
+                         status.HTTP_409_CONFLICT)
+        self.assertEqual(self.client.get(second['result_url']).status_code, status.HTTP_200_OK)
+
+    def test_load_data_job_reloads_the_catalog(self):
+        # Run from another directory: the CSV paths hang off BASE_DIR, not the cwd.
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tempfile.gettempdir())
+        with mock.patch.object(jobs.logger, 'info') as log, redirect_stdout(io.StringIO()):
+            response = self.client.post('/api/jobs/', {"kind": "load_data"}, format='json')
+        self.assertEqual(response.data['status'], Job.SUCCEEDED, response.data['error'])
+
+        download = self.client.get(response.data['result_url'])
+        counts = json.loads(b''.join(download.streaming_content))
+        self.assertEqual(counts['artworks'], Artwork.objects.count())
+        self.assertGreater(counts['artworks'], 1000)
+        self.assertFalse(Artwork.objects.filter(title__startswith="Job Piece").exists())
+        # The loader's stages reach the progress callback.
+        stages = [call.args[-1] for call in log.call_args_list]
+        self.assertEqual(stages[0], "Clearing existing data")
+        self.assertIn("Counting artworks per artist", stages)
+
+    def test_failed_load_keeps_the_old_catalog(self):
+        broken = mock.patch('collection.scripts.data_loader.load_artworks_and_relationships',
+                            side_effect=RuntimeError("bad CSV"))
+        with broken, redirect_stdout(io.StringIO()), self.assertLogs('collection.jobs', 'ERROR'):
+            response = self.client.post('/api/jobs/', {"kind": "load_data"}, format='json')
+        self.assertEqual(response.data['status'], Job.FAILED)
+        self.assertIn("bad CSV", response.data['error'])
+        # The clear ran in the same transaction, so it was rolled back too.
+        self.assertEqual(sorted(Artwork.objects.values_list('pk', flat=True)), [11, 12])
+        self.assertFalse(Change.objects.filter(action=Change.DELETE).exists())
+
+    def test_runner_lock_is_exclusive(self):
+        lock_file = Path(jobs.job_settings()['RESULT_DIR']) / 'runner.lock'
+        held = jobs.acquire_runner_lock(lock_file)
+        self.assertIsNotNone(held)
+        self.assertIsNone(jobs.acquire_runner_lock(lock_file))
+        os.close(held)
+
+
+
+class RunJobsCommandTests(TransactionTestCase):
+    # The runner's pool threads use their own connections, so the queued
+    # jobs have to be committed for them to see the rows.
+
+    def setUp(self):
+        reset_runtime_state()
+        result_dir = tempfile.mkdtemp(prefix='museum-job-results-')
+        self.addCleanup(shutil.rmtree, result_dir, ignore_errors=True)
+        overrides = override_settings(JOBS={
+            'RUNNER': 'worker', 'MAX_WORKERS': 1, 'POLL_INTERVAL': 0.05, 'NICE': 0,
+            'RESULT_DIR': result_dir, 'LOCK_FILE': Path(result_dir) / 'runner.lock',
+        })
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_once_drains_the_whole_queue(self):
+        # More jobs than MAX_WORKERS: --once keeps dispatching until all are done.
+        for _ in range(3):
+            Job.objects.create(kind=Job.AGGREGATES)
+        call_command('run_jobs', '--once', stdout=io.StringIO())
+        self.assertEqual(list(Job.objects.values_list('status', flat=True)), [Job.SUCCEEDED] * 3)
+
+    def test_steps_aside_when_another_runner_holds_the_lock(self):
+        held = jobs.acquire_runner_lock()
+        self.addCleanup(os.close, held)
+        with self.assertRaises(SystemExit) as exited:
+            call_command('run_jobs', '--once', stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(exited.exception.code, 3)
+
+
+
+# Every endpoint and the plan lines it's allowed to have.
+# Full-list routes scan by design; anything else must hit an index.
+# Patterns use the SQLite >= 3.36 wording; query_plan.normalize() maps older output to it.
+FULL_LIST = [r'^SCAN collection_artwork$']
+ENDPOINT_PLAN_ALLOWLIST = {
+    '/api/artworks/': FULL_LIST,
+    '/api/artworks/1/': [],
+    '/api/artworks/?ids=1,2': [],
+    '/api/artworks/recent/': [],
+    '/api/artists/': [r'^SCAN collection_artist USING INDEX sqlite_autoindex'],
+    '/api/artists/{artist}/': [],
+    '/api/artists/?ids={artist}': [],
+    '/api/artists/prolific/': [],
+    '/api/mediums/': [r'^SCAN collection_mediumcategory USING COVERING INDEX sqlite_autoindex'],
+    '/api/mediums/{medium}/': [],
+    # Aggregates over every medium, then sorts by the count (HAVING > 5 keeps it small).
+    '/api/mediums/summary/': [r'^SCAN collection_mediumcategory$', r'TEMP B-TREE FOR ORDER BY'],
+    '/api/changes/?since=0': [],
+    '/api/jobs/{job}/': [],
+}
+
+
+class QueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    def setUp(self):
+        reset_runtime_state()
+        self.client = APIClient()
+        self.artist = Artist.objects.create(name="Plan Artist")
+        self.medium = MediumCategory.objects.create(name="Plan Medium")
+        for object_id in (1, 2):
+            artwork = Artwork.objects.create(object_id=object_id, title="Plan Piece", department="Lehman",
+                                             end_date_year=1995, artist=self.artist)
+            artwork.mediums.add(self.medium)
+        self.job = Job.objects.create(kind=Job.EXPORT)
+
+    def test_endpoints_use_indexes(self):
+        for url, allow in ENDPOINT_PLAN_ALLOWLIST.items():
+            url = url.format(artist=self.artist.pk, medium=self.medium.pk, job=self.job.pk)
+            with self.subTest(url=url):
+                reset_runtime_state()  # don't let the object cache hide the queries
+                plans = self.assertIndexedPlans(lambda: self.client.get(url), allow=allow)
+                self.assertTrue(plans, f"{url} ran no queries")
+
+    def test_guard_flags_scans_and_temp_btrees(self):
+        details = ['SCAN collection_artwork', 'USE TEMP B-TREE FOR ORDER BY',
+                   'SEARCH collection_artwork USING INTEGER PRIMARY KEY (rowid=?)']
+        self.assertEqual(plan_problems(details), details[:2])
+        self.assertEqual(plan_problems(details, allow=FULL_LIST), details[1:2])
+
+    def test_old_sqlite_plan_format_is_normalized(self):
+        # SQLite < 3.36 says "SCAN TABLE"; the allowlists use the newer form.
+        self.assertEqual(normalize('SCAN TABLE collection_artwork'), 'SCAN collection_artwork')
+        self.assertEqual(normalize('SEARCH TABLE collection_artwork USING INTEGER PRIMARY KEY (rowid=?)'),
+                         'SEARCH collection_artwork USING INTEGER PRIMARY KEY (rowid=?)')
+        self.assertEqual(plan_problems([normalize('SCAN TABLE collection_artwork')], allow=FULL_LIST), [])
+
+
+
+class ArtistQualityTests(TestCase):
+    def setUp(self):
+        reset_runtime_state()
+        self.client = APIClient()
+
+    def test_classifier_rules(self):
+        # Real names seen in artist_final.csv
+        self.assertTrue(classify_name("Chinese")['is_nationality_label'])
+        self.assertTrue(classify_name("Italy (Naples)")['is_nationality_label'])
+        self.assertTrue(classify_name("Thai|Thai")['is_nationality_label'])
+        self.assertTrue(classify_name("Domenico Tintoretto|Jacopo Tintoretto")['is_multi_attribution'])
+        self.assertTrue(classify_name("Follower of Guercino")['is_qualified_attribution'])
+        self.assertTrue(classify_name("Haly workshop")['is_qualified_attribution'])
+        self.assertTrue(classify_name("Giovanni Battista Tiepolo")['is_individual'])
+        self.assertTrue(classify_name("Pseudo-Melioli")['is_individual'])
+
+    def test_classifier_over_the_whole_artist_csv(self):
+        names = set()
+        with open(Path(settings.BASE_DIR) / 'data' / 'artist_final.csv', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                names.add(row['name'].strip())
+                names.update(split_names(row['name']))
+        individuals = {name for name in names if classify_name(name)['is_individual']}
+
+        not_people = [
+            "Unidentified Artist", "American Painter", "British artist (London)",
+            "Southern Netherlands", "Northern France", "Austro-Hungarian", "Ferrara",
+            "Gubbio", "Tyrol", "Sèvres Manufactory", "early 19th century painter",
+            "Netherlandish Painter, second half of 16th century",
+            "Italian, Neapolitan Follower of Giotto", "Veronese School", "Italian or Spanish",
+        ]
+        people = [
+            "Paolo Veronese (Paolo Caliari)", "Raphael (Raffaello Sanzio or Santi)",
+            "Lorenzo Veneziano", "Master of Frankfurt", "The Saint Ubaldus Painter",
+            "Bernard of Paris", "Giovanni Bertini da Firenze",
+        ]
+        for name in not_people:
+            with self.subTest(name=name):
+                self.assertIn(name, names)
+                self.assertNotIn(name, individuals)
+        for name in people:
+            with self.subTest(name=name):
+                self.assertIn(name, individuals)
+
+    @override_settings(ARTIST_CLASSIFIER={'LABEL_WORDS': ['mystery'], 'QUALIFIER_PATTERNS': []})
+    def test_rules_are_configurable(self):
+        self.assertTrue(classify_name("Mystery")['is_nationality_label'])
+        self.assertTrue(classify_name("Follower of Guercino")['is_individual'])
+
+    def test_former_attributions_are_not_split_out(self):
+        names = attributed_names("Follower of Barna da Siena|Bartolo di Fredi", "Former Attribution|Artist")
+        self.assertEqual(names, ["Bartolo di Fredi"])
+
+    def test_prolific_only_lists_individuals_by_precomputed_count(self):
+        label = Artist.objects.create(name="Chinese")
+        pair = Artist.objects.create(name="Jacopo|Domenico")
+        jacopo = Artist.objects.create(name="Jacopo")
+        self.assertFalse(label.is_individual)
+        for object_id, artist in ((1, label), (2, label), (3, pair), (4, jacopo)):
+            Artwork.objects.create(object_id=object_id, title="t", department="d", artist=artist)
+        # The pair's artwork is credited to Jacopo through the split attribution
+        Artwork.objects.get(pk=3).attributions.add(jacopo)
+
+        response = self.client.get('/api/artists/prolific/')
+        self.assertEqual([(row['artist_name'], row['artwork_count']) for row in response.data], [("Jacopo", 2)])
+
+    def test_counts_follow_artwork_writes(self):
+        first = Artist.objects.create(name="First Artist")
+        second = Artist.objects.create(name="Second Artist")
+        artwork = Artwork.objects.create(object_id=1, title="t", department="d", artist=first)
+        first.refresh_from_db()
+        self.assertEqual(first.artwork_count, 1)
+
+        artwork.artist = second
+        artwork.save()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.artwork_count, second.artwork_count), (0, 1))
+
+        artwork.delete()
+        second.refresh_from_db()
+        self.assertEqual(second.artwork_count, 0)
+
+    def test_renaming_reclassifies(self):
+        artist = Artist.objects.create(name="Someone Real")
+        self.client.patch(f'/api/artists/{artist.pk}/', {"name": "Follower of Someone"}, format='json')
+        artist.refresh_from_db()
+        self.assertTrue(artist.is_qualified_attribution)
+        self.assertFalse(artist.is_individual)
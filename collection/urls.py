@@ -3,15 +3,16 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
-    ArtworkViewSet, ArtistViewSet, MediumCategoryViewSet,
+    ArtworkViewSet, ArtistViewSet, MediumCategoryViewSet, JobViewSet,
     ProlificArtistView, MediumSummaryView, RecentArtworksView,
-    api_root
+    ChangeFeedView, api_root, object_cache_stats, admission_stats
 )
 # Create a router instance for handling ViewSets (standard CRUD)
 router = DefaultRouter()
 router.register(r'artworks', ArtworkViewSet)
 router.register(r'artists', ArtistViewSet)
 router.register(r'mediums', MediumCategoryViewSet)
+router.register(r'jobs', JobViewSet)
 
 urlpatterns = [
     # My landing page
@@ -27,6 +28,15 @@ urlpatterns = [
     # Query 3: Recent artworks (on or after 1990)
     path('artworks/recent/', RecentArtworksView.as_view(), name='recent-artworks'),
 
+    # Delta sync: ordered upserts/tombstones after ?since=<seq>
+    path('changes/', ChangeFeedView.as_view(), name='change-feed'),
+
+    # Hit ratio / eviction counters for the per-object cache
+    path('cache/stats/', object_cache_stats, name='object-cache-stats'),
+
+    # Admission control counters (429s / 503s) for tuning the limits
+    path('admission/stats/', admission_stats, name='admission-stats'),
+
 # Standard CRUD routes (handled by the router)
     path('', include(router.urls)),
 ]
\ No newline at end of file
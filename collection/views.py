@@ -1,41 +1,142 @@
 import platform
 import django
-from rest_framework import viewsets, generics
+from django.http import FileResponse, Http404
+from rest_framework import mixins, status, viewsets, generics
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.decorators import api_view
+from rest_framework.decorators import action, api_view
 from rest_framework.reverse import reverse
+from rest_framework.exceptions import ValidationError
+from django.db import transaction
 from django.db.models import Count
-from .models import Artist, Artwork, MediumCategory
+from .admission import controller as admission_controller
+from .cache import artwork_cache, artist_cache, cache_stats, change_sync, MISSING
+from . import jobs
+from .models import Artist, Artwork, MediumCategory, Change, Job
 from .serializers import (
     ArtworkSerializer, 
     ArtistSerializer, 
     MediumCategorySerializer, 
     ProlificArtistSerializer,
-    MediumSummarySerializer
+    MediumSummarySerializer,
+    JobSerializer
 )
 
+# Largest value SQLite (and Django's BigIntegerField) can store. Anything bigger
+# in a query string would blow up with OverflowError inside the DB driver.
+MAX_DB_INT = 2 ** 63 - 1
+
 # ----------------------------------------------------
 # 1. Standard CRUD Endpoints (R3)
 # Just the basic stuff. Using ViewSets here because it's
 # cleaner and handles all the standard GET/POST methods for me.
 # ----------------------------------------------------
 
-class ArtworkViewSet(viewsets.ModelViewSet):
+class CachedObjectMixin:
+    """
+    Adds `?ids=1,2,3` batch lookups to a ModelViewSet and routes both the
+    batch and the single-object GET through a read-through object cache.
+    Invalidation is driven by the Change log, so it covers writes from any
+    process and any code path, not just this viewset (see cache.ChangeLogSync).
+    """
+    object_cache = None
+    max_batch_ids = 100
+
+    def list(self, request, *args, **kwargs):
+        if 'ids' in request.query_params:
+            return self.batch_retrieve(request)
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            key = int(kwargs[self.lookup_field])
+        except (TypeError, ValueError):
+            # Not a valid pk, so let the normal lookup produce the 404.
+            return super().retrieve(request, *args, **kwargs)
+        if abs(key) > MAX_DB_INT:
+            raise Http404
+
+        change_sync.sync()
+        data = self.object_cache.get(key)
+        if data is MISSING:
+            data = self._serialize(self.get_object())
+            self.object_cache.set(key, data)
+        return Response(data)
+
+    def batch_retrieve(self, request):
+        ids = self._parse_ids(request.query_params['ids'])
+        change_sync.sync()
+        found, missing = self.object_cache.get_many(ids)
+
+        if missing:
+            # One query (plus the prefetches) for everything the cache didn't have.
+            for obj in self.get_queryset().filter(pk__in=missing):
+                data = self._serialize(obj)
+                self.object_cache.set(obj.pk, data)
+                found[obj.pk] = data
+
+        # Keyed by the requested id, in the order asked for. Unknown ids map
+        # to null, so the client can tell which payload answers which id.
+        return Response({pk: found.get(pk) for pk in ids})
+
+    def _serialize(self, obj):
+        # A plain dict: serializer.data is a ReturnDict that holds on to the
+        # serializer, and through its context the whole request, for the TTL.
+        return dict(self.get_serializer(obj).data)
+
+    def _parse_ids(self, raw):
+        try:
+            ids = [int(part) for part in raw.split(',') if part.strip()]
+        except ValueError:
+            raise ValidationError({'ids': 'Expected a comma separated list of integer ids.'})
+        if any(abs(pk) > MAX_DB_INT for pk in ids):
+            raise ValidationError({'ids': f'Ids must be between {-MAX_DB_INT} and {MAX_DB_INT}.'})
+        if len(ids) > self.max_batch_ids:
+            raise ValidationError({'ids': f'At most {self.max_batch_ids} ids per request.'})
+        # Drop duplicates but keep the first-seen order.
+        return list(dict.fromkeys(ids))
+
+
+class AtomicWriteMixin:
+    """
+    Runs create/update/destroy in one transaction, so the row and the Change
+    rows its signal receivers write are committed (or rolled back) together.
+    Otherwise a failed log write would leave a change mirrors never hear about.
+    """
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            super().perform_update(serializer)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            super().perform_destroy(instance)
+
+
+class ArtworkViewSet(AtomicWriteMixin, CachedObjectMixin, viewsets.ModelViewSet):
     """
     All the artworks. I ordered them by object_id so 
     the frontend list stays consistent.
+    Pulling the artist and mediums in up front avoids a query per row.
     """
-    queryset = Artwork.objects.all().order_by('object_id')
+    queryset = Artwork.objects.select_related('artist').prefetch_related('mediums').order_by('object_id')
     serializer_class = ArtworkSerializer
+    object_cache = artwork_cache
 
-class ArtistViewSet(viewsets.ModelViewSet):
+class ArtistViewSet(AtomicWriteMixin, CachedObjectMixin, viewsets.ModelViewSet):
     """
     Artist list ordered by name. Simple and straightforward.
     """
     queryset = Artist.objects.all().order_by('name')
     serializer_class = ArtistSerializer
+    object_cache = artist_cache
 
-class MediumCategoryViewSet(viewsets.ModelViewSet):
+class MediumCategoryViewSet(AtomicWriteMixin, viewsets.ModelViewSet):
     """
     The types of materials used. 
     Ordering by name makes it much easier to find stuff in the dropdowns.
@@ -52,22 +153,18 @@ class MediumCategoryViewSet(viewsets.ModelViewSet):
 class ProlificArtistView(generics.ListAPIView):
     """
     Query #1: Finding the top 10 artists with the most works.
-    I noticed the dataset has a lot of messy entries that aren't real names,
-    so I added a filter to get rid of those nationality.....tag(?).
+    I noticed the dataset has a lot of messy entries that aren't real names
+    (nationality tags, 'A|B' pairs, 'Follower of ...'). The loader now flags
+    those once at import time (artist_quality.py), so this is just a read.
     """
     serializer_class = ProlificArtistSerializer
 
     def get_queryset(self):
-        # Data Cleaning: Removing nationality labels like 'Italian' or 'Unknown'.
-        # I found this weird 'Thai|Thai' tag while checking the CSV, so that goes too.
-        exclusion_list = ['Chinese', 'Italian', 'French', 'American', 'European', 'Unknown Artist', 'German', 'Dutch', 'Thai|Thai'] 
-        
-        # Using .annotate to count how many artworks each artist has.
-        # Then sorting by that count to see who's the most active.
-        queryset = Artist.objects.annotate(
-            artwork_count=Count('artworks')
-        ).exclude(
-            name__in=exclusion_list 
+        # Data Cleaning: only real single people, using the precomputed count.
+        # artist_prolific_idx covers both the filter and the sort.
+        queryset = Artist.objects.filter(
+            is_individual=True,
+            artwork_count__gt=0
         ).order_by('-artwork_count')[:10] # Just the top 10 is enough.
         
         return queryset
@@ -98,7 +195,176 @@ class RecentArtworksView(generics.ListAPIView):
 
     def get_queryset(self):
         # Frontend logic: show newest stuff first.
-        return Artwork.objects.filter(end_date_year__gte=1990).order_by('-end_date_year')
+        # The end_date_year index covers both the range filter and the sort.
+        return Artwork.objects.select_related('artist').prefetch_related('mediums').filter(
+            end_date_year__gte=1990
+        ).order_by('-end_date_year')
+
+
+# ----------------------------------------------------
+# 3. Delta Sync
+# Mirrors used to re-download /api/artworks/ on every sync.
+# Now they keep the last seq they saw and only ask for what changed.
+# ----------------------------------------------------
+
+class ChangeFeedView(APIView):
+    """
+    GET /api/changes/?since=<seq>&limit=<n>
+    Returns the changes after `since` in seq order. Upserts carry the
+    object's current payload, deletes are tombstones with data = null.
+    Keep calling with `since=next_since` until `has_more` is false.
+    A new mirror starts from since=0: the log was seeded with every row
+    that existed when it was created, so that is a full snapshot.
+    """
+    default_limit = 500
+    max_limit = 1000
+
+    # model_name -> (queryset, serializer) used to render upserts
+    sources = {
+        'artwork': (Artwork.objects.select_related('artist').prefetch_related('mediums'), ArtworkSerializer),
+        'artist': (Artist.objects.all(), ArtistSerializer),
+        'mediumcategory': (MediumCategory.objects.all(), MediumCategorySerializer),
+    }
+
+    def get(self, request, format=None):
+        since = self._int_param(request, 'since', 0)
+        limit = min(max(self._int_param(request, 'limit', self.default_limit), 1), self.max_limit)
+
+        # seq is the primary key, so this is a range read on the PK index.
+        # Fetching one extra row tells us whether there's another page.
+        page = list(Change.objects.filter(seq__gt=since).order_by('seq')[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+
+        # Only the newest entry per object matters to a mirror.
+        latest = {}
+        for change in page:
+            latest[(change.model_name, change.object_id)] = change
+        changes = sorted(latest.values(), key=lambda change: change.seq)
+
+        payloads = self._load_payloads(changes)
+        results = []
+        for change in changes:
+            data = None
+            if change.action == Change.UPSERT:
+                data = payloads.get((change.model_name, change.object_id))
+                if data is None:
+                    # Deleted since; its tombstone comes in a later page.
+                    continue
+            results.append({
+                'seq': change.seq,
+                'model': change.model_name,
+                'object_id': change.object_id,
+                'action': change.action,
+                'data': data,
+            })
+
+        return Response({
+            'results': results,
+            'next_since': page[-1].seq if page else since,
+            'has_more': has_more,
+        })
+
+    def _load_payloads(self, changes):
+        # One query per model, however many objects changed.
+        wanted = {}
+        for change in changes:
+            if change.action == Change.UPSERT:
+                wanted.setdefault(change.model_name, set()).add(change.object_id)
+
+        payloads = {}
+        for model_name, ids in wanted.items():
+            if model_name not in self.sources:
+                continue
+            queryset, serializer_class = self.sources[model_name]
+            for obj in queryset.filter(pk__in=ids):
+                payloads[(model_name, obj.pk)] = serializer_class(obj).data
+        return payloads
+
+    def _int_param(self, request, name, default):
+        raw = request.query_params.get(name)
+        if raw in (None, ''):
+            return default
+        try:
+            value = int(raw)
+        except ValueError:
+            raise ValidationError({name: 'Must be an integer.'})
+        if value < 0:
+            raise ValidationError({name: 'Must not be negative.'})
+        if value > MAX_DB_INT:
+            raise ValidationError({name: f'Must be at most {MAX_DB_INT}.'})
+        return value
+
+
+# ----------------------------------------------------
+# 4. Background Jobs
+# Exports / aggregate rebuilds / loader runs are queued here and
+# run by `manage.py run_jobs`. Clients poll the job until it's done.
+# ----------------------------------------------------
+
+class JobViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    POST /api/jobs/ with {"kind": "export" | "aggregates" | "load_data"}
+    queues a job. GET /api/jobs/{id}/ shows its progress, and
+    /api/jobs/{id}/result/ downloads the artifact once it succeeded.
+    Only staff users can queue jobs.
+    """
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+
+    def get_permissions(self):
+        if self.action == 'create':
+            return [IsAdminUser()]
+        return [AllowAny()]
+
+    def perform_create(self, serializer):
+        jobs.submit(serializer.save())
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        kind = serializer.validated_data['kind']
+        if jobs.queue_is_full(kind):
+            return Response(
+                {'detail': f"Too many {kind} jobs are already queued, try again later."},
+                status=status.HTTP_409_CONFLICT
+            )
+        self.perform_create(serializer)
+        # 202: accepted, but the work happens later
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED,
+                        headers=self.get_success_headers(serializer.data))
+
+    @action(detail=True)
+    def result(self, request, pk=None):
+        job = self.get_object()
+        if job.status != Job.SUCCEEDED or not job.result_file:
+            return Response(
+                {'detail': f"Job is {job.status}, there is no result yet."},
+                status=status.HTTP_409_CONFLICT
+            )
+        path = jobs.result_path(job)
+        if not path.exists():
+            return Response({'detail': "The result file is gone."}, status=status.HTTP_410_GONE)
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name,
+                            content_type='application/json')
+
+
+@api_view(['GET'])
+def object_cache_stats(request, format=None):
+    """
+    Hit ratio, evictions and size of this worker's object caches.
+    Useful for tuning OBJECT_CACHE in settings.
+    """
+    return Response(cache_stats())
+
+
+@api_view(['GET'])
+def admission_stats(request, format=None):
+    """
+    Admitted / throttled (429) / shed (503) counts for this worker,
+    overall and per endpoint, next to the limits that produced them.
+    """
+    return Response(admission_controller.stats())
 
 
 @api_view(['GET'])
@@ -124,5 +390,9 @@ def api_root(request, format=None):
             'query_prolific_artists': reverse('prolific-artists', request=request, format=format),
             'query_medium_usage': reverse('medium-summary', request=request, format=format),
             'query_recent_collection': reverse('recent-artworks', request=request, format=format),
+            'submit_job': reverse('job-list', request=request, format=format),
+            'change_feed': reverse('change-feed', request=request, format=format),
+            'object_cache_stats': reverse('object-cache-stats', request=request, format=format),
+            'admission_stats': reverse('admission-stats', request=request, format=format),
         }
     })
\ No newline at end of file
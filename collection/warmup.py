@@ -0,0 +1,121 @@
+# collection/warmup.py
+#
+# Things the first request on a fresh gunicorn worker would otherwise pay
+# for: building the URL resolver, DRF's serializer field introspection,
+# opening the SQLite connection (and pulling the hot pages into its cache)
+# and filling the in-process object caches.
+# gunicorn.conf.py calls warm_up() when a worker boots.
+
+import logging
+import time
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+ALL_STEPS = ('urls', 'serializers', 'database', 'caches')
+
+
+def warm_urls():
+    resolver = get_resolver()
+    # Touching reverse_dict forces the full populate() that reverse()/resolve() do lazily.
+    resolver.reverse_dict
+    resolver.resolve('/api/')
+
+
+def warm_serializers():
+    from rest_framework.renderers import JSONRenderer
+    from .serializers import (
+        ArtistSerializer, ArtworkSerializer, MediumCategorySerializer,
+        MediumSummarySerializer, ProlificArtistSerializer,
+    )
+    for serializer_class in (
+        ArtworkSerializer, ArtistSerializer, MediumCategorySerializer,
+        ProlificArtistSerializer, MediumSummarySerializer,
+    ):
+        # .fields runs the model field -> serializer field mapping
+        serializer_class().fields
+    JSONRenderer().render({})
+
+
+def warm_database():
+    from django.db import connection
+    from .models import Artist, Artwork, MediumCategory
+    from .views import MediumSummaryView, ProlificArtistView, RecentArtworksView
+
+    connection.ensure_connection()
+    # Walk every table and index behind the hot endpoints once, so list,
+    # retrieve, ?ids= and the mediums/attributions lookups find their pages
+    # in SQLite's page cache. NOT INDEXED / INDEXED BY make SQLite read
+    # exactly that b-tree instead of whichever one is smallest.
+    tables = [model._meta.db_table for model in (
+        Artwork, Artist, MediumCategory, Artwork.mediums.through, Artwork.attributions.through,
+    )]
+    with connection.cursor() as cursor:
+        for table in tables:
+            cursor.execute(f'SELECT count(*) FROM "{table}" NOT INDEXED')
+            cursor.execute(f'PRAGMA index_list("{table}")')
+            # Rows are (seq, name, unique, origin, partial)
+            for _, index, _, _, partial in cursor.fetchall():
+                if partial:
+                    continue  # Only usable with its WHERE; the prolific query below reads it.
+                cursor.execute(f'PRAGMA index_info("{index}")')
+                column = cursor.fetchone()[2]
+                cursor.execute(f'SELECT count("{column}") FROM "{table}" INDEXED BY "{index}"')
+
+    # The aggregate endpoints, run in full (they're small) to read the
+    # partial prolific index and the medium join.
+    for view_class in (ProlificArtistView, MediumSummaryView, RecentArtworksView):
+        list(view_class().get_queryset())
+
+
+def warm_caches():
+    from .cache import artist_cache, artwork_cache, change_sync
+    from .serializers import ArtistSerializer, ArtworkSerializer
+    from .views import ArtistViewSet, ArtworkViewSet
+
+    count = getattr(settings, 'WARMUP', {}).get('PRIME_OBJECTS', 0)
+    if not count:
+        return
+    # Take the Change log position first, so writes made while we fill the
+    # caches still invalidate what we put in.
+    change_sync.sync()
+    for viewset, cache, serializer_class in (
+        (ArtworkViewSet, artwork_cache, ArtworkSerializer),
+        (ArtistViewSet, artist_cache, ArtistSerializer),
+    ):
+        for obj in viewset.queryset.all()[:count]:
+            # Plain dict, same as CachedObjectMixin._serialize stores
+            cache.set(obj.pk, dict(serializer_class(obj).data))
+
+
+STEPS = {
+    'urls': warm_urls,
+    'serializers': warm_serializers,
+    'database': warm_database,
+    'caches': warm_caches,
+}
+
+
+def warm_up(steps=ALL_STEPS):
+    """
+    Runs the given warm-up steps and returns {step: seconds}.
+    Database errors are logged and the step skipped, so a missing table
+    or an unmigrated database never stops a worker from booting.
+    """
+    timings = {}
+    if not getattr(settings, 'WARMUP', {}).get('ENABLED', True):
+        return timings
+
+    for name in steps:
+        started = time.perf_counter()
+        try:
+            STEPS[name]()
+        except DatabaseError:
+            logger.warning("Warm-up step %r failed, skipping it", name, exc_info=True)
+        timings[name] = time.perf_counter() - started
+
+    logger.info("Warm-up finished: %s", ", ".join(f"{k}={v * 1000:.1f}ms" for k, v in timings.items()))
+    return timings
@@ -0,0 +1,68 @@
+# gunicorn.conf.py
+#
+# Warm-up hooks so a freshly autoscaled worker doesn't make its first
+# requests pay for URL resolving, serializer introspection and a cold
+# SQLite page cache. Set GUNICORN_PRELOAD=1 to import and warm the app
+# once in the master and share it with the forked workers.
+#
+# The master also starts the background job runner (manage.py run_jobs).
+# It has to live on the same box as the web workers because it shares
+# their SQLite file and job_results/ directory, so it isn't a separate
+# Procfile process. `run_jobs --respawn` restarts the runner if it
+# crashes, because gunicorn itself only looks after its web workers.
+# Set GUNICORN_JOB_RUNNER=0 to leave it out.
+
+import os
+import signal
+import subprocess
+import sys
+from pathlib import Path
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', '0') == '1'
+start_job_runner = os.environ.get('GUNICORN_JOB_RUNNER', '1') == '1'
+
+job_runner = None
+
+
+def when_ready(server):
+    global job_runner
+    if start_job_runner:
+        # The runner nices itself and exits straight away if another one
+        # already holds JOBS['LOCK_FILE'].
+        job_runner = subprocess.Popen(
+            [sys.executable, 'manage.py', 'run_jobs', '--respawn'], cwd=Path(__file__).resolve().parent
+        )
+        server.log.info("Started job runner supervisor (pid %s)", job_runner.pid)
+
+    # Only runs the app code when it was preloaded into the master.
+    if not server.cfg.preload_app:
+        return
+    from django.db import connections
+    from collection.warmup import warm_up
+
+    warm_up()
+    # Forked workers must not share the master's SQLite handle.
+    connections.close_all()
+
+
+def on_exit(server):
+    if job_runner is None or job_runner.poll() is not None:
+        return
+    # SIGTERM (the same thing a dyno shutdown sends) lets the runner
+    # finish the jobs it's on before exiting.
+    job_runner.send_signal(signal.SIGTERM)
+    try:
+        job_runner.wait(timeout=25)
+    except subprocess.TimeoutExpired:
+        job_runner.kill()
+
+
+def post_worker_init(worker):
+    from collection.warmup import ALL_STEPS, warm_up
+
+    if worker.cfg.preload_app:
+        # URLs, serializers and caches came over with the fork;
+        # only the connection and its page cache are per-process.
+        warm_up(steps=('database',))
+    else:
+        warm_up(steps=ALL_STEPS)
@@ -7,6 +7,8 @@ import sys
 def main():
     """Run administrative tasks."""
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'museum_api_project.settings')
+    # Turns on the dev-only apps (django_extensions) for management commands
+    os.environ.setdefault('MUSEUM_MANAGEMENT_APPS', '1')
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,12 +39,17 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'collection',
-    'django_extensions',
     'rest_framework',
 ]
 
+# django_extensions is only there for `manage.py runscript data_loader`.
+# manage.py sets this flag, so the web workers never import it.
+if os.environ.get('MUSEUM_MANAGEMENT_APPS') == '1':
+    INSTALLED_APPS.append('django_extensions')
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'collection.admission.AdmissionControlMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -81,6 +87,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep the connection (and SQLite's page cache with it) between requests
+        # so the warm-up in collection/warmup.py isn't thrown away.
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -131,4 +141,74 @@ STATICFILES_DIRS = [
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Cloud deployment root
-STATIC_ROOT = BASE_DIR / 'staticfiles'
\ No newline at end of file
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Per-worker read-through cache for single and batch (?ids=) lookups
+# on the artwork/artist endpoints. TTL is in seconds. Entries are dropped
+# as soon as the Change log shows a write; if more than MAX_REPLAY changes
+# arrived since the last look, the whole cache is dropped instead.
+OBJECT_CACHE = {
+    'MAX_SIZE': 2048,
+    'TTL': 300,
+    'MAX_REPLAY': 1000,
+}
+
+# Worker boot warm-up (see gunicorn.conf.py). PRIME_OBJECTS is how many
+# artworks/artists get pre-loaded into the object cache.
+WARMUP = {
+    'ENABLED': True,
+    'PRIME_OBJECTS': 200,
+}
+
+# Per-client token buckets and concurrency caps (collection/admission.py),
+# both shared by every worker on the box, so RATE/BURST are per client, not
+# per client per worker.
+# Costs and caps are keyed by URL name; the full list and the aggregate
+# views are the expensive ones. Counters are at /api/admission/stats/.
+ADMISSION_CONTROL = {
+    'ENABLED': True,
+    'RATE': 20,
+    'BURST': 60,
+    'DEFAULT_COST': 1,
+    'COSTS': {
+        'artwork-list': 10,
+        'artist-list': 5,
+        'mediumcategory-list': 5,
+        'prolific-artists': 10,
+        'medium-summary': 10,
+        'recent-artworks': 3,
+        'change-feed': 2,
+    },
+    'CONCURRENCY': {
+        'artwork-list': 2,
+        'prolific-artists': 2,
+        'medium-summary': 2,
+    },
+    # Heroku's router adds exactly one X-Forwarded-For hop
+    'PROXY_COUNT': 1,
+}
+
+# Background jobs (collection/jobs.py), run by `manage.py run_jobs`, which
+# gunicorn.conf.py starts inside the web dyno (it needs the same SQLite file
+# and RESULT_DIR). KIND_LIMITS caps how many jobs of one kind run at the same
+# time, MAX_QUEUED how many may wait.
+JOBS = {
+    'RUNNER': 'worker',
+    'MAX_WORKERS': 2,
+    'KIND_LIMITS': {
+        'load_data': 1,
+        'export': 1,
+        'aggregates': 1,
+    },
+    'POLL_INTERVAL': 2,
+    'NICE': 10,
+    'MAX_QUEUED': 3,
+    'KEEP_RESULTS': 5,
+    'RESULT_DIR': BASE_DIR / 'job_results',
+}
+
+# Rules for flagging artist names that aren't a single person (nationality
+# labels, 'A|B' pairs, 'Follower of ...'). Any key set here overrides the
+# defaults in collection/artist_quality.py, e.g.
+# ARTIST_CLASSIFIER = {'LABEL_WORDS': [...], 'QUALIFIER_PATTERNS': [...]}
+# Run an 'aggregates' job afterwards to re-apply them to existing artists.
\ No newline at end of file